@@ -0,0 +1,233 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg2
+from psycopg2 import sql
+
+# The checkpoint is written with the app's atomic_write so both handle interrupted writes the same way
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Streamlit_App"))
+from atomic_file import atomic_write  # noqa: E402
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_PATH = os.path.join(DATA_DIR, "load_raw_checkpoint.json")
+
+# Raw tables declared in BigSupplyCo_dbt/models/sources/sources.yml and the file each one is synced from
+RAW_FILES = {
+    "categories_s3_files_to_postgres": "BigSupplyCo_Categories.csv",
+    "customers_s3_files_to_postgres": "BigSupplyCo_Customers.csv",
+    "departments_s3_files_to_postgres": "BigSupplyCo_Departments.csv",
+    "products_s3_files_to_postgres": "BigSupplyCo_Products.csv",
+    "orders_s3_files_to_postgres": "BigSupplyCo_Orders.csv",
+}
+
+# Airbyte lower-cased a few headers, the staging models read these names, keyed by the lower-cased header
+RAW_COLUMN_NAMES = {
+    "latitude": "latitude",
+    "longitude": "longitude",
+    "market": "market",
+    "sales": "sales",
+    "order date (dateorders)": "order date (DateOrders)",
+}
+
+# Columns Airbyte adds to every row. The staging models use _airbyte_normalized_at as etl_update_ts,
+# so the loader fills them the way a sync would.
+AIRBYTE_DEFAULTS = {
+    "_airbyte_ab_id": "gen_random_uuid()::text",
+    "_airbyte_emitted_at": "now()",
+    "_airbyte_normalized_at": "now()",
+}
+
+COPY_BUFFER_BYTES = 1 << 20
+
+_checkpoint_lock = threading.Lock()
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_header(path: str) -> list:
+    with open(path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+
+def load_checkpoint(path: str = CHECKPOINT_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(checkpoint: dict, path: str = CHECKPOINT_PATH):
+    with atomic_write(path) as tmp_path, open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2, sort_keys=True)
+
+
+def checkpoint_key(conn, schema: str, table: str) -> str:
+    # Per database, so loading another database is not skipped because of this one
+    params = conn.get_dsn_parameters()
+    return f"{params.get('host', '')}:{params.get('port', '')}/{params.get('dbname', '')}/{schema}.{table}"
+
+
+def table_columns(cur, schema: str, table: str) -> dict:
+    # Existing columns keyed by their lower-cased name, with whether they already have a default
+    cur.execute("""
+        select column_name, column_default is not null
+        from information_schema.columns
+        where table_schema = %s and table_name = %s
+    """, (schema, table))
+    return {name.lower(): (name, has_default) for name, has_default in cur.fetchall()}
+
+
+def create_table(cur, schema: str, table: str, header: list):
+    # Same layout as Airbyte's normalized tables: every file column as text plus the Airbyte columns
+    columns = [sql.SQL("{} text").format(sql.Identifier(RAW_COLUMN_NAMES.get(name.lower(), name))) for name in header]
+    columns += [
+        sql.SQL("{} text default gen_random_uuid()::text").format(sql.Identifier("_airbyte_ab_id")),
+        sql.SQL("{} timestamp with time zone default now()").format(sql.Identifier("_airbyte_emitted_at")),
+        sql.SQL("{} timestamp with time zone default now()").format(sql.Identifier("_airbyte_normalized_at")),
+    ]
+    cur.execute(sql.SQL("create table {}.{} ({})").format(sql.Identifier(schema), sql.Identifier(table), sql.SQL(", ").join(columns)))
+
+
+def airbyte_sync_stats(cur, schema: str, table: str):
+    # Rows and seconds of the Airbyte sync that filled the table, from its emitted/normalized stamps
+    cur.execute(sql.SQL("""
+        select count(*), extract(epoch from max(_airbyte_normalized_at) - min(_airbyte_emitted_at))
+        from {}.{}
+    """).format(sql.Identifier(schema), sql.Identifier(table)))
+    rows, seconds = cur.fetchone()
+    if not rows or not seconds:
+        return None
+    return {"rows": rows, "seconds": float(seconds)}
+
+
+def load_table(dsn: str, schema: str, table: str, path: str, force: bool = False, checkpoint_path: str = CHECKPOINT_PATH) -> dict:
+    # Replaces the table's rows with the file in one transaction, so a failed load leaves the old rows.
+    # TRUNCATE takes an ACCESS EXCLUSIVE lock: readers of the table wait until the COPY commits and then
+    # see the new load, they are blocked for the length of the load rather than served the old rows.
+    digest = file_hash(path)
+    header = read_header(path)
+    conn = psycopg2.connect(dsn)
+    try:
+        key = checkpoint_key(conn, schema, table)
+        with _checkpoint_lock:
+            previous = load_checkpoint(checkpoint_path).get(key)
+        if previous and previous["sha256"] == digest and not force:
+            return {"table": table, "skipped": True, **previous}
+
+        with conn, conn.cursor() as cur:
+            existing = table_columns(cur, schema, table)
+            airbyte = previous.get("airbyte") if previous else None
+            if not existing:
+                create_table(cur, schema, table, header)
+                existing = table_columns(cur, schema, table)
+            elif previous is None and "_airbyte_emitted_at" in existing:
+                # First load over a table Airbyte filled, keep its throughput to compare against
+                airbyte = airbyte_sync_stats(cur, schema, table)
+
+            missing = [name for name in header if name.lower() not in existing]
+            if missing:
+                raise ValueError(f"{schema}.{table} has no column for {', '.join(missing)} in {os.path.basename(path)}")
+            # Header names are matched case-insensitively, Airbyte lower-cased some of them
+            targets = [existing[name.lower()][0] for name in header]
+
+            # Defaults only for this transaction, the table keeps Airbyte's definition
+            temporary_defaults = [
+                column for column, expression in AIRBYTE_DEFAULTS.items()
+                if column in existing and not existing[column][1]
+            ]
+            for column in temporary_defaults:
+                cur.execute(sql.SQL("alter table {}.{} alter column {} set default " + AIRBYTE_DEFAULTS[column]).format(
+                    sql.Identifier(schema), sql.Identifier(table), sql.Identifier(column)))
+
+            started = time.perf_counter()
+            cur.execute(sql.SQL("truncate table {}.{}").format(sql.Identifier(schema), sql.Identifier(table)))
+            copy = sql.SQL("copy {}.{} ({}) from stdin with (format csv, header true, encoding 'UTF8')").format(
+                sql.Identifier(schema), sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, targets)))
+            with open(path, "rb") as f:
+                cur.copy_expert(copy.as_string(conn), f, size=COPY_BUFFER_BYTES)
+            rows = cur.rowcount
+            seconds = time.perf_counter() - started
+
+            for column in temporary_defaults:
+                cur.execute(sql.SQL("alter table {}.{} alter column {} drop default").format(
+                    sql.Identifier(schema), sql.Identifier(table), sql.Identifier(column)))
+    finally:
+        conn.close()
+
+    result = {"sha256": digest, "rows": rows, "seconds": seconds, "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    if airbyte:
+        result["airbyte"] = airbyte
+    # Checkpointed as soon as the table commits, a rerun after a failure only loads what is left
+    with _checkpoint_lock:
+        checkpoint = load_checkpoint(checkpoint_path)
+        checkpoint[key] = result
+        save_checkpoint(checkpoint, checkpoint_path)
+    return {"table": table, "skipped": False, **result}
+
+
+def rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:,.0f} rows/s" if seconds else "-"
+
+
+# Start a local Postgres with `docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:15`, then
+# do `PGHOST=localhost PGUSER=postgres PGPASSWORD=postgres python load_raw.py` (connection from PG* env vars)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the BigSupplyCo CSV files into the raw Postgres tables with COPY")
+    parser.add_argument("--dsn", default="", help="libpq connection string, PG* env vars when empty")
+    parser.add_argument("--schema", default="public", help="schema of the raw tables")
+    parser.add_argument("--jobs", type=int, default=len(RAW_FILES), help="tables loaded in parallel")
+    parser.add_argument("--force", action="store_true", help="reload files whose hash did not change")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("tables", nargs="*", help="raw tables to load, all when omitted")
+    args = parser.parse_args()
+
+    tables = args.tables or list(RAW_FILES)
+    jobs = {}
+    for table in tables:
+        path = os.path.join(DATA_DIR, RAW_FILES[table])
+        if not os.path.exists(path):
+            print(f"{table}: skipped, {RAW_FILES[table]} is not in {DATA_DIR}")
+            continue
+        jobs[table] = path
+
+    started = time.perf_counter()
+    results = []
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(load_table, args.dsn, args.schema, table, path, args.force, args.checkpoint): table for table, path in jobs.items()}
+        for future in as_completed(futures):
+            # A failed table is reported and the others still are, its checkpoint is untouched so a rerun retries it
+            try:
+                result = future.result()
+            except Exception as e:
+                failed[futures[future]] = e
+                print(f"{futures[future]}: failed, {type(e).__name__}: {e}")
+                continue
+            results.append(result)
+            if result["skipped"]:
+                print(f"{result['table']}: unchanged since {result['loaded_at']}, skipped")
+                continue
+            line = f"{result['table']}: {result['rows']:,} rows in {result['seconds']:.2f}s, {rate(result['rows'], result['seconds'])}"
+            if "airbyte" in result:
+                line += f" (Airbyte sync: {rate(result['airbyte']['rows'], result['airbyte']['seconds'])})"
+            print(line)
+    seconds = time.perf_counter() - started
+
+    loaded = [r for r in results if not r["skipped"]]
+    rows = sum(r["rows"] for r in loaded)
+    print(f"{len(loaded)} tables, {rows:,} rows in {seconds:.2f}s: {rate(rows, seconds)}")
+    if failed:
+        raise SystemExit(f"{len(failed)} of {len(jobs)} tables failed: {', '.join(sorted(failed))}")
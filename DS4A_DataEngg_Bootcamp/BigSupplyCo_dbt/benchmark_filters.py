@@ -0,0 +1,97 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+# The SQL comes from the app's own builders so the benchmark runs exactly what the pages run
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Streamlit_App"))
+import paging  # noqa: E402
+import queries  # noqa: E402
+
+# Planner settings that make Postgres ignore the indexes, i.e. run as before they existed
+NO_INDEX_SETTINGS = ["enable_indexscan", "enable_bitmapscan", "enable_indexonlyscan"]
+
+
+def filter_patterns(conn, table: str) -> dict:
+    # The visualizations() page filters on region, category and segment together, the chatbot
+    # mostly on one of them. The values are the most common combination so every query returns rows.
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            select order_region_addr, category_name_attr, customer_segment_cat
+            from {table}
+            group by 1, 2, 3
+            order by count(*) desc
+            limit 1
+        """)
+        region, category, segment = cur.fetchone()
+    sidebar = {"ORDER_REGION_ADDR": region, "CATEGORY_NAME_ATTR": category, "CUSTOMER_SEGMENT_CAT": segment}
+    patterns = {
+        "first page of filtered orders": paging.page_sql(queries.filtered_orders_sql(sidebar, table)),
+        "region sales": queries.region_sales_sql(sidebar, table),
+        "sales and profit over time": queries.sales_profit_sql(sidebar, table),
+        "delivery status": queries.delivery_status_sql(sidebar, table),
+    }
+    for column, value in sidebar.items():
+        patterns[f"sales over time by {column.lower()}"] = queries.sales_profit_sql({column: value}, table)
+    patterns["orders in the last 30 days"] = f"""
+SELECT ORDER_DT AS ORDER_DT, SUM(SALES_AMT) AS SALES_AMT
+FROM {table}
+WHERE ORDER_DT > (SELECT MAX(ORDER_DT) FROM {table}) - 30
+GROUP BY ORDER_DT
+"""
+    return patterns
+
+
+def time_query(conn, sql: str, repeats: int) -> float:
+    # Median of `repeats` runs after one warm-up, so both sides read from a warm cache
+    seconds = []
+    with conn.cursor() as cur:
+        for _ in range(repeats + 1):
+            started = time.perf_counter()
+            cur.execute(sql)
+            cur.fetchall()
+            seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds[1:])
+
+
+def set_indexes_enabled(conn, enabled: bool):
+    with conn.cursor() as cur:
+        for setting in NO_INDEX_SETTINGS:
+            cur.execute(f"set {setting} = {'on' if enabled else 'off'}")
+
+
+def table_indexes(conn, schema: str, table: str) -> list:
+    with conn.cursor() as cur:
+        cur.execute("select indexdef from pg_indexes where schemaname = %s and tablename = %s", (schema, table))
+        return [row[0] for row in cur.fetchall()]
+
+
+# do `python benchmark_filters.py` after `dbt run --select orders --full-refresh` against the local Postgres
+# (connection from PG* env vars)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the app's filter queries on the orders model with and without its indexes")
+    parser.add_argument("--dsn", default="", help="libpq connection string, PG* env vars when empty")
+    parser.add_argument("--schema", default="public", help="schema the models are built in")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per query, the median is reported")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    table = f"{args.schema}.orders"
+    indexes = table_indexes(conn, args.schema, "orders")
+    if not indexes:
+        print(f"{table} has no indexes, build it with `dbt run --select orders --full-refresh` first")
+    for indexdef in indexes:
+        print(indexdef)
+
+    print(f"{'query':<45}{'before':>10}{'after':>10}{'speedup':>10}")
+    for name, sql in filter_patterns(conn, table).items():
+        set_indexes_enabled(conn, False)
+        before = time_query(conn, sql, args.repeats)
+        set_indexes_enabled(conn, True)
+        after = time_query(conn, sql, args.repeats)
+        print(f"{name:<45}{before * 1000:>8.1f}ms{after * 1000:>8.1f}ms{before / after:>9.1f}x")
+    conn.close()
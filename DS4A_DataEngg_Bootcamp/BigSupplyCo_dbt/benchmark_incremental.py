@@ -0,0 +1,64 @@
+import argparse
+import subprocess
+import time
+
+import psycopg2
+
+# Models rebuilt on every run, from the staging orders down to the app's ORDERS table
+SELECTOR = "stg_bigsupplyco__orders+"
+RAW_ORDERS = "public.orders_s3_files_to_postgres"
+
+
+def dbt_run(selector: str, target: str = None, full_refresh: bool = False) -> float:
+    command = ["dbt", "run", "--select", selector]
+    if target:
+        command += ["--target", target]
+    if full_refresh:
+        command.append("--full-refresh")
+    started = time.perf_counter()
+    subprocess.run(command, check=True)
+    return time.perf_counter() - started
+
+
+def append_orders(conn, rows: int) -> int:
+    # Copies the latest `rows` raw order items as new ones, with fresh ids and a new
+    # _airbyte_normalized_at, the way the next Airbyte sync would append them
+    with conn, conn.cursor() as cur:
+        cur.execute(f"""
+            create temp table new_orders on commit drop as
+            select * from {RAW_ORDERS} order by "Order Item Id"::integer desc limit %s
+        """, (rows,))
+        cur.execute(f"""
+            update new_orders
+            set "Order Item Id" = ("Order Item Id"::integer + (select max("Order Item Id"::integer) from {RAW_ORDERS}))::text,
+                _airbyte_normalized_at = now()
+        """)
+        cur.execute(f"insert into {RAW_ORDERS} select * from new_orders")
+        return cur.rowcount
+
+
+def count_rows(conn, relation: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute(f"select count(*) from {relation}")
+        return cur.fetchone()[0]
+
+
+# do `python benchmark_incremental.py --target dev --rows 1000` against the local Postgres (connection from PG* env vars)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare full-refresh and incremental dbt runs of the orders models")
+    parser.add_argument("--target", help="dbt target to run against, the profile's default when omitted")
+    parser.add_argument("--dsn", default="", help="libpq connection string of the same database, PG* env vars when empty")
+    parser.add_argument("--schema", default="public", help="schema the models are built in")
+    parser.add_argument("--rows", type=int, default=1000, help="order items to append before the incremental run")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    full_seconds = dbt_run(SELECTOR, args.target, full_refresh=True)
+    before = count_rows(conn, f"{args.schema}.fct_orders")
+    appended = append_orders(conn, args.rows)
+    incremental_seconds = dbt_run(SELECTOR, args.target)
+    after = count_rows(conn, f"{args.schema}.fct_orders")
+    conn.close()
+
+    print(f"full refresh: {full_seconds:.1f}s for {before:,} order items")
+    print(f"incremental:  {incremental_seconds:.1f}s after appending {appended:,} ({after - before:,} new rows in fct_orders)")
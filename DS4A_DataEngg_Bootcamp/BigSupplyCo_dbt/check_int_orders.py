@@ -0,0 +1,63 @@
+import argparse
+import time
+
+import psycopg2
+
+# int_orders as it was built before the dims were deduplicated: a DISTINCT over the whole join,
+# with dim_departments being a DISTINCT over one row per department location
+BEFORE_SQL = """
+    select distinct *
+    from {schema}.fct_orders as orders
+    left join {schema}.dim_customers as customers
+    on orders.order_customer_id = customers.customer_id
+    left join (
+        select distinct department_id, department_name_attr from {schema}.stg_bigsupplyco__departments
+    ) as departments
+    on orders.order_department_id = departments.department_id
+    left join {schema}.dim_products as products
+    on orders.order_item_cardprod_id = products.product_card_id
+    left join {schema}.dim_categories as categories
+    on categories.category_id = products.product_category_id
+"""
+
+# The join int_orders runs now
+AFTER_SQL = """
+    select *
+    from {schema}.fct_orders as orders
+    left join {schema}.dim_customers as customers
+    on orders.order_customer_id = customers.customer_id
+    left join {schema}.dim_departments as departments
+    on orders.order_department_id = departments.department_id
+    left join {schema}.dim_products as products
+    on orders.order_item_cardprod_id = products.product_card_id
+    left join {schema}.dim_categories as categories
+    on categories.category_id = products.product_category_id
+"""
+
+
+def timed_count(conn, sql: str):
+    with conn.cursor() as cur:
+        started = time.perf_counter()
+        cur.execute(f"select count(*) from ({sql}) as q")
+        rows = cur.fetchone()[0]
+    return rows, time.perf_counter() - started
+
+
+# do `python check_int_orders.py` after `dbt run` against the local Postgres (connection from PG* env vars)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare int_orders row counts and timings before and after removing the DISTINCT")
+    parser.add_argument("--dsn", default="", help="libpq connection string, PG* env vars when empty")
+    parser.add_argument("--schema", default="public", help="schema the models are built in")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    before_rows, before_seconds = timed_count(conn, BEFORE_SQL.format(schema=args.schema))
+    after_rows, after_seconds = timed_count(conn, AFTER_SQL.format(schema=args.schema))
+    fct_rows, _ = timed_count(conn, f"select 1 from {args.schema}.fct_orders")
+    conn.close()
+
+    print(f"fct_orders: {fct_rows:,} rows")
+    print(f"before (distinct over the join): {before_rows:,} rows in {before_seconds:.2f}s")
+    print(f"after (deduplicated dims):      {after_rows:,} rows in {after_seconds:.2f}s")
+    if not before_rows == after_rows == fct_rows:
+        raise SystemExit("Row counts differ, a dim still has more than one row per key or fct_orders has duplicate rows")
@@ -0,0 +1,45 @@
+import argparse
+import os
+import tomllib
+
+# dbt never builds ORDERS on Snowflake, Airbyte syncs it, so its clustering key is set here instead
+# of in models/orders.sql. Same columns as the Postgres indexes there, lowest cardinality first so
+# pruning works on each: the sidebar filters on segment, region and category, the time series on order_dt.
+TABLE = "AIRBYTE_DATABASE.AIRBYTE_SCHEMA.ORDERS"
+CLUSTER_COLUMNS = ["CUSTOMER_SEGMENT_CAT", "ORDER_REGION_ADDR", "CATEGORY_NAME_ATTR", "ORDER_DT"]
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Streamlit_App", ".streamlit", "secrets.toml")
+
+
+def cluster_sql(table: str) -> str:
+    return f"ALTER TABLE {table} CLUSTER BY ({', '.join(CLUSTER_COLUMNS)})"
+
+
+def clustering_information_sql(table: str) -> str:
+    return f"SELECT SYSTEM$CLUSTERING_INFORMATION('{table}', '({', '.join(CLUSTER_COLUMNS)})')"
+
+
+# do `python cluster_orders.py` once after the first Airbyte sync of ORDERS, the key stays on the table
+# across syncs and Snowflake reclusters in the background (connection from the app's [connections.snowpark] secrets)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Set the clustering key of the Airbyte synced ORDERS table on Snowflake")
+    parser.add_argument("--secrets", default=SECRETS_PATH, help="secrets.toml with a [connections.snowpark] section")
+    parser.add_argument("--table", default=TABLE, help="fully qualified ORDERS table")
+    parser.add_argument("--dry-run", action="store_true", help="print the statements instead of running them")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print(cluster_sql(args.table))
+        print(clustering_information_sql(args.table))
+    else:
+        import snowflake.connector
+
+        with open(args.secrets, "rb") as f:
+            params = tomllib.load(f)["connections"]["snowpark"]
+        conn = snowflake.connector.connect(**params)
+        try:
+            cur = conn.cursor()
+            cur.execute(cluster_sql(args.table))
+            cur.execute(clustering_information_sql(args.table))
+            print(cur.fetchone()[0])
+        finally:
+            conn.close()
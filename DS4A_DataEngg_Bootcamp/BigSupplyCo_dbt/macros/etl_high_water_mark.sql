@@ -0,0 +1,4 @@
+{# Latest etl_update_ts already loaded into this incremental model, new rows must be newer #}
+{% macro etl_high_water_mark(column='etl_update_ts') %}
+    (select coalesce(max({{ column }}), '1900-01-01'::timestamp) from {{ this }})
+{% endmacro %}
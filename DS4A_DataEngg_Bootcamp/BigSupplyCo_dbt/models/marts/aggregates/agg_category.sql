@@ -0,0 +1,17 @@
+{{ config(materialized='table') }}
+
+with orders as (
+    select * from {{ ref('orders') }}
+),
+
+final as (
+    select
+        product_category_id
+        , category_name_attr
+        , sum(sales_amt) as total_sales_amt_per_category_val
+        , count(*) as n_orders_per_category_val
+    from orders
+    group by product_category_id, category_name_attr
+)
+
+select * from final
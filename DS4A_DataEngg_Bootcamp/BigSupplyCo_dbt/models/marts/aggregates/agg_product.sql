@@ -0,0 +1,18 @@
+{{ config(materialized='table') }}
+
+with orders as (
+    select * from {{ ref('orders') }}
+),
+
+final as (
+    select
+        product_card_id
+        , product_name_attr
+        , variance(product_price_amt) as product_price_variance_val
+        , stddev(product_price_amt) as product_price_stddev_val
+        , count(*) as n_orders_per_product_val
+    from orders
+    group by product_card_id, product_name_attr
+)
+
+select * from final
@@ -0,0 +1,16 @@
+{{ config(materialized='table') }}
+
+with orders as (
+    select * from {{ ref('orders') }}
+),
+
+final as (
+    select
+        order_region_addr
+        , count(*) as n_orders_per_region_val
+        , sum(sales_amt) as total_sales_amt_per_region_val
+    from orders
+    group by order_region_addr
+)
+
+select * from final
@@ -0,0 +1,16 @@
+{{ config(materialized='table') }}
+
+with orders as (
+    select * from {{ ref('orders') }}
+),
+
+final as (
+    select
+        customer_segment_cat
+        , avg(order_item_total_amt) as avg_order_amt_per_segment_val
+        , count(*) as n_orders_per_segment_val
+    from orders
+    group by customer_segment_cat
+)
+
+select * from final
@@ -4,9 +4,13 @@ with departments as (
     select * from {{ ref('stg_bigsupplyco__departments') }}
 ),
 
+-- The source has one row per department location, collapsed here to one row per department
 final as (
-    select {{ dbt_utils.star(from=ref('stg_bigsupplyco__departments'), except=['etl_update_ts','latitude_val','longitude_val']) }}
+    select
+        department_id
+        , min(department_name_attr) as department_name_attr
     from departments
+    group by department_id
 )
 
-select distinct * from final
\ No newline at end of file
+select * from final
\ No newline at end of file
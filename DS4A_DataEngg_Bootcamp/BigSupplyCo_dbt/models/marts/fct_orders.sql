@@ -1,11 +1,20 @@
-{{ config(materialized='table') }}
+{{ config(
+    materialized='incremental',
+    unique_key=['order_id', 'order_item_id'],
+    on_schema_change='append_new_columns',
+) }}
+
+-- etl_update_ts is kept as the high-water mark of the incremental runs
 
 with orders as (
     select * from {{ ref('stg_bigsupplyco__orders') }}
+    {% if is_incremental() %}
+    where etl_update_ts > {{ etl_high_water_mark() }}
+    {% endif %}
 ),
 
 final as (
-    select {{ dbt_utils.star(from=ref('stg_bigsupplyco__orders'), except=['etl_update_ts']) }}
+    select {{ dbt_utils.star(from=ref('stg_bigsupplyco__orders')) }}
     from orders
 )
 
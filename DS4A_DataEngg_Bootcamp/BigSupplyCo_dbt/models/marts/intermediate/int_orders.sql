@@ -1,5 +1,17 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['order_id', 'order_item_id'],
+    on_schema_change='append_new_columns',
+) }}
+
+-- Only new order items are joined to the dims on incremental runs. A change to a dim is not
+-- propagated to existing rows, run with --full-refresh after reloading customers or products.
+
 with orders as (
     select * from {{ ref('fct_orders') }}
+    {% if is_incremental() %}
+    where etl_update_ts > {{ etl_high_water_mark() }}
+    {% endif %}
 ),
 
 customers as (
@@ -18,8 +30,10 @@ categories as (
     select * from {{ ref('dim_categories') }}
 ),
 
+-- Every dim has one row per join key (see marts/schema.yml), so the joins cannot fan out
+-- and no DISTINCT is needed
 final as (
-    select distinct *
+    select *
     from orders
     left join customers 
     on orders.order_customer_id = customers.customer_id
@@ -1,10 +1,20 @@
-{{ config(materialized="table") }}
+{{ config(
+    materialized="incremental",
+    unique_key=["order_id", "order_item_id"],
+    on_schema_change="append_new_columns",
+) }}
+
+-- Incremental: only rows Airbyte normalized after the last run are read and merged on the key.
+-- `dbt run --full-refresh --select stg_bigsupplyco__orders+` rebuilds it and everything downstream.
 
 with
 
 source  as (
 
     select * from {{ source('public','orders_s3_files_to_postgres') }}
+    {% if is_incremental() %}
+    where _airbyte_normalized_at > {{ etl_high_water_mark() }}
+    {% endif %}
 
 ),
 
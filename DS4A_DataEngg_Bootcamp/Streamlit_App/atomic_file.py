@@ -0,0 +1,17 @@
+import os
+import threading
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path: str):
+    # Yields a temp path to write to and moves it over `path` once the block succeeds, so a concurrent
+    # reader or an interrupted writer never leaves half a file. One temp file per process and thread
+    # since two sessions can write the same file at once.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
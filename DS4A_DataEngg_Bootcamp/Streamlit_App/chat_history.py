@@ -0,0 +1,92 @@
+import functools
+
+import streamlit as st
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# gpt-3.5-turbo has a 4,096 token context, the rest is left for the answer
+DEFAULT_PROMPT_TOKEN_BUDGET = 3000
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_QUESTION_CHARS = 120
+SUMMARY_MAX_QUESTIONS = 20
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    # Looking the encoding up resolves the model name and loads its ranks, once per model is enough
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text))
+    # Roughly 4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: dict) -> int:
+    # Counted once per message and kept on it, so reruns do not re-tokenize the whole history
+    if "tokens" not in message:
+        message["tokens"] = count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+    return message["tokens"]
+
+
+def summarize(messages: list) -> dict:
+    # Dropped turns are replaced by the list of questions that were asked, no extra LLM call needed
+    questions = [m["content"][:SUMMARY_QUESTION_CHARS] for m in messages if m["role"] == "user"][-SUMMARY_MAX_QUESTIONS:]
+    content = "Earlier in this conversation the user asked:\n" + "\n".join(f"- {q}" for q in questions)
+    return {"role": "system", "content": content}
+
+
+def _start_on_user_turn(kept: list, used: int) -> int:
+    # The window starts on a user turn so the model never sees an answer without its question
+    while len(kept) > 1 and kept[0]["role"] != "user":
+        used -= message_tokens(kept.pop(0))
+    return used
+
+
+def build_prompt(messages: list, budget: int = DEFAULT_PROMPT_TOKEN_BUDGET):
+    # Always keeps the system prompt (messages[0]) and the latest message, then as many of the
+    # most recent turns as fit in the budget. Returns the messages to send and their token stats.
+    system, turns = messages[0], messages[1:]
+    used = message_tokens(system)
+    kept = []
+    for message in reversed(turns):
+        tokens = message_tokens(message)
+        if kept and used + tokens > budget:
+            break
+        kept.append(message)
+        used += tokens
+    kept.reverse()
+    used = _start_on_user_turn(kept, used)
+
+    prompt = [system]
+    dropped = turns[:len(turns) - len(kept)]
+    if dropped:
+        # Older turns make room for a short summary of them, still within the budget
+        summary = summarize(dropped)
+        summary_tokens = count_tokens(summary["content"]) + MESSAGE_OVERHEAD_TOKENS
+        while len(kept) > 1 and used + summary_tokens > budget:
+            used -= message_tokens(kept.pop(0))
+            used = _start_on_user_turn(kept, used)
+            dropped = turns[:len(turns) - len(kept)]
+            summary = summarize(dropped)
+            summary_tokens = count_tokens(summary["content"]) + MESSAGE_OVERHEAD_TOKENS
+        prompt.append(summary)
+        used += summary_tokens
+    prompt.extend(kept)
+
+    stats = {
+        "prompt_tokens": used,
+        "kept_turns": len(kept),
+        "dropped_turns": len(dropped),
+    }
+    return [{"role": m["role"], "content": m["content"]} for m in prompt], stats
+
+
+def get_prompt_token_budget() -> int:
+    return int(st.secrets.get("CHAT_PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET))
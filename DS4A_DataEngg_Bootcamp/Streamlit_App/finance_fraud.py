@@ -0,0 +1,229 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import fraud_eda
+import fraud_model
+import fraud_scoring
+import ingest
+
+SCORING_BATCH_ROWS = 10_000
+SCORED_ROWS_SHOWN = 100
+
+def data_science():
+    st.write("""The task: build a predictive model to determine the likelihood (by assigning a risk score) of a new transaction being fraudulent or not""")
+        
+    # Perform exploratory data analysis to identify insights and patterns that can help you build the model.
+    # Understand the dataset and its features to assess data quality and prepare it as needed.
+    # Every chart reads the pre-aggregated fraud counts, built once per transaction file
+    cube, cube_stamp = fraud_eda.load_cube()
+    st.caption(f"{cube_stamp['fraudulent']:,} fraudulent out of {cube_stamp['transactions']:,} transactions")
+    
+    # # Filter data to limit the x-axis range
+    # filtered_data = fraud_data[(fraud_data['Amount'] >= -200) & (fraud_data['Amount'] <= 2000)]
+
+    # Create a histogram using Plotly
+    st.subheader('Distribution of Fraudulent Transaction Amounts')
+
+    amounts = fraud_eda.amount_histogram(cube)
+    fig = px.bar(x=(amounts['bin_start'] + amounts['bin_end']) / 2, y=amounts['count'])
+    fig.update_traces(width=amounts['bin_end'] - amounts['bin_start'], marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    # Customize the layout
+    fig.update_layout(
+        xaxis_title='Amount',
+        yaxis_title='Number of Transactions',
+        bargap=0,
+    )
+
+    # Display the Plotly figure in Streamlit
+    st.plotly_chart(fig)
+
+
+    st.subheader('Number of Fraudulent Transactions by State')
+
+    # Get the top 30 cities
+    top_cities = fraud_eda.counts(cube, 'Merchant State')
+
+    # Create a bar chart using Plotly
+    fig = px.bar(top_cities, x='count', y='Merchant State', orientation='h')
+    fig.update_traces(marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    # Customize the layout
+    fig.update_layout(
+        xaxis_title='Number of Transactions',
+        yaxis_title='Merchant State',
+    )
+
+    st.plotly_chart(fig)
+
+    
+    st.subheader('Number of Fraudulent Transactions by Top 30 Cities')
+
+    top_cities = fraud_eda.counts(cube, 'Merchant City')
+
+    fig = px.bar(top_cities, x='count', y='Merchant City', orientation='h')
+    fig.update_traces(marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Number of Transactions',
+        yaxis_title='Merchant City',
+    )
+
+    st.plotly_chart(fig)
+
+    
+    st.subheader('Number of Fraudulent Transactions by Year')
+
+    fig = px.bar(fraud_eda.counts(cube, 'Year'), x='Year', y='count')
+    fig.update_traces(marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Year',
+        yaxis_title='Number of Transactions',
+        xaxis_type='category',
+    )
+
+    st.plotly_chart(fig)
+
+    
+    st.subheader('Number of Fraudulent Transactions by Month')
+
+    fig = px.bar(fraud_eda.counts(cube, 'Month'), y='count', x='Month')
+    fig.update_traces(marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Month',
+        yaxis_title='Number of Transactions',
+        xaxis_type='category',
+    )
+
+    st.plotly_chart(fig)
+
+    
+    st.subheader('Number of Fraudulent Transactions by Day of the Month')
+
+    fig = px.bar(fraud_eda.counts(cube, 'Day'), y='count', x='Day')
+    fig.update_traces(marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Day of the Month',
+        yaxis_title='Number of Transactions',
+        xaxis_type='category',
+    )
+
+    st.plotly_chart(fig)
+
+
+    st.subheader('Number of Fraudulent Transactions by Day of the Week')
+
+    fig = px.bar(fraud_eda.counts(cube, 'Day of Week'), y='count', x='Day of Week')
+    fig.update_traces(marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Day of the Week',
+        yaxis_title='Number of Transactions',
+        xaxis_type='category',
+    )
+
+    st.plotly_chart(fig)
+
+
+    st.subheader('Number of Fraudulent Transactions by Hour')
+
+    fig = px.bar(fraud_eda.counts(cube, 'Hour'), y='count', x='Hour')
+    fig.update_traces(marker_color='navy', marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Hour',
+        yaxis_title='Number of Transactions',
+        xaxis_type='category',
+    )
+
+    st.plotly_chart(fig)
+
+    
+    st.subheader('Distribution of Fraudulent Transactions by Use Chip')
+
+    fig = px.bar(fraud_eda.counts(cube, 'Use Chip'), y='count', x='Use Chip', color='Use Chip')
+    fig.update_traces(marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Use Chip',
+        yaxis_title='Number of Transactions',
+        xaxis_type='category',
+        showlegend=False
+    )
+
+    st.plotly_chart(fig)
+    
+    @st.cache_resource
+    def load_fraud_model(path, modified):
+        # Keyed on the file's modification time, so a retrained artifact is picked up without a restart
+        return fraud_model.load_artifact(path)
+
+    # The model is trained offline by `python fraud_model.py`, the page only loads what it saved
+    artifact = load_fraud_model(fraud_model.ARTIFACT_PATH, os.path.getmtime(fraud_model.ARTIFACT_PATH) if os.path.exists(fraud_model.ARTIFACT_PATH) else None)
+    if artifact is None:
+        st.warning("No trained model yet, run `python fraud_model.py` to train one.")
+        return
+    if not fraud_model.is_current(artifact, fraud_model.data_fingerprint()):
+        st.info("The model was trained on an older version of the transaction data, run `python fraud_model.py` to retrain it.")
+    if artifact.get("synthetic"):
+        st.warning("This model was trained on synthetic transactions, its metrics say nothing about real fraud. Retrain it on the transaction file with `python fraud_model.py`.")
+    st.caption(f"Model trained {artifact['trained_at']} in {artifact['train_seconds']:.0f}s")
+
+    def show_results(metrics):
+        st.text(metrics["report"])
+        conf_matrix = np.array(metrics["confusion_matrix"])
+        conf_matrix_display = np.array([[f"TN: {conf_matrix[0, 0]}", f"FP: {conf_matrix[0, 1]}"],
+                                        [f"FN: {conf_matrix[1, 0]}", f"TP: {conf_matrix[1, 1]}"]])
+        st.table(conf_matrix_display)
+
+    st.write("**Random Forest Classifier Results:**")
+    show_results(artifact["metrics"]["baseline"])
+
+    st.write("**Best hyperparameters:**", artifact["best_params"])
+    search = artifact.get("search")
+    if search:
+        st.caption(f"{search['mode'].capitalize()} search over {len(search['candidates'])} candidates in {search['seconds']:.0f}s")
+        candidates = pd.DataFrame([{**c["params"], "f1_macro": c["f1_macro"], "seconds": c["seconds"]} for c in search["candidates"]])
+        st.dataframe(candidates.sort_values(by="f1_macro", ascending=False).astype({"max_depth": str}), hide_index=True)
+
+    st.write("**Random Forest Classifier Results with Best Hyperparameters:**")
+    show_results(artifact["metrics"]["best"])
+
+    # Present the best model for predicting fraudulent transactions and key insights from the analysis.
+    st.subheader('Feature Importances using Random Forest')
+
+    fig = px.bar(artifact["importances"], x='Feature Importance', y='Features', orientation='h', color='Features')
+    fig.update_traces(marker_line_color='black', marker_line_width=1)
+
+    fig.update_layout(
+        xaxis_title='Importance',
+        yaxis_title='Features',
+        showlegend=False
+    )
+
+    st.plotly_chart(fig)
+
+    st.subheader('Score New Transactions')
+
+    # Scored in micro-batches with the saved pipeline, only the riskiest rows are kept for display
+    new_transactions = st.file_uploader("Transactions to score", type=['CSV', 'PARQUET'])
+    if new_transactions is not None:
+        scorer = fraud_scoring.FraudScorer(artifact)
+        riskiest = pd.DataFrame()
+        try:
+            for chunk in ingest.iter_chunks(new_transactions, ingest.file_kind(new_transactions.name), SCORING_BATCH_ROWS):
+                scored = chunk.assign(**{'Risk Score': scorer.score(chunk)})
+                riskiest = pd.concat([riskiest, scored]).nlargest(SCORED_ROWS_SHOWN, 'Risk Score')
+        except ValueError as e:
+            st.error(f"Could not score the file: {e}")
+        else:
+            stats = scorer.stats()
+            st.caption(f"{stats['rows']:,} transactions scored in {stats['batches']} batches, p50 {stats['p50_ms']:.0f}ms, p99 {stats['p99_ms']:.0f}ms per batch ({stats['rows_per_second']:,.0f} rows/s)")
+            st.dataframe(riskiest, hide_index=True)
@@ -0,0 +1,225 @@
+import os
+import time
+
+import openai
+import pandas as pd
+import streamlit as st
+
+import db
+import ingest
+import query_cache
+import tracing
+import transformations
+
+
+def data_ingestor():
+    st.title('Big Supply Co. - Finance Analysis')
+
+    st.title('Data Ingestion Tool')
+
+    st.header('Upload your dataset for processing')
+
+    # The upload is only ever read in chunks, the page works on a preview of the first rows
+    chunk_rows = int(st.secrets.get("INGEST_CHUNK_ROWS", ingest.DEFAULT_CHUNK_ROWS))
+    uploaded_file = st.file_uploader("Choose a file", type=['CSV','PARQUET'])
+    # A new upload starts over: the transformations are not applied yet and the last CSV export is stale
+    upload_id = uploaded_file.file_id if uploaded_file is not None else None
+    if st.session_state.get("ingest_upload_id") != upload_id:
+        st.session_state.ingest_upload_id = upload_id
+        st.session_state.apply_transformations = False
+        if st.session_state.get("export_csv_path") and os.path.exists(st.session_state.export_csv_path):
+            os.remove(st.session_state.export_csv_path)
+        st.session_state.export_csv_path = None
+    if uploaded_file is not None:
+        file_kind = ingest.file_kind(uploaded_file.name)
+        dataframe = ingest.preview(uploaded_file, file_kind)
+        # Every chunk is read with the preview's column types, the table is created from the first one
+        column_dtypes = ingest.csv_dtypes(dataframe) if file_kind == "csv" else None
+        total_rows = ingest.count_rows(uploaded_file, file_kind)
+        st.caption(f"Showing the first {len(dataframe):,} rows" + (f" of {total_rows:,}" if total_rows is not None else ""))
+        st.write(dataframe)
+
+    st.header('Upload the transformations you want to apply')
+
+    ## TODO: Add at least 5 transformations that you consider will be beneficial for cleaning the data in order to be consumed by a machine learning model.
+
+    uploaded_transformation_file = st.file_uploader("Choose a JSON file", type=['JSON'])
+    if uploaded_transformation_file is not None:
+        # The spec is validated and compiled once into an ordered plan of column operations
+        try:
+            transformation_plan = transformations.compile_plan(transformations.load_spec(uploaded_transformation_file))
+        except ValueError as e:
+            st.error(f"Invalid transformations file: {e}")
+            transformation_plan = None
+        else:
+            st.write(pd.DataFrame(transformation_plan.steps, columns=['Rule', 'Column', 'Argument']).astype(str))
+
+#         {
+#     "Expires": {"astype":"date"},
+# 	"Card Number": {"astype":"str"},
+#     "Card Number": {"len":12},
+#     "Has Chip": {"map":{"YES":1, "NO":0}},
+#     "Card on Dark Web": {"map":{"YES":1, "NO":0}},
+#     "Acct Open Date": {"datediff":"Today"},
+#     "CARD INDEX": {"rename":"Card Index"}
+# }
+
+        if transformation_plan is not None and st.button('Apply Transformations'):
+            # Remembered across reruns, the exports below apply the plan chunk by chunk
+            st.session_state.apply_transformations = True
+        if transformation_plan is None:
+            st.session_state.apply_transformations = False
+        plan = transformation_plan if st.session_state.get("apply_transformations") else None
+
+        if plan is not None:
+            with st.spinner('Applying Transformations...'):
+                dataframe, report = plan.apply(dataframe)
+                if not report["applied"]:
+                    st.info("Transformations Not Applicable.")
+                else:
+                    st.success("Transformations Applied!")
+                    for column, invalid in report["invalid_rows"].items():
+                        if invalid:
+                            st.warning(f"{invalid:,} rows of '{column}' in the preview do not have the expected length.")
+                    st.write(dataframe)
+
+        def stream_upload(sinks):
+            # One pass over the upload: read a chunk, transform it, hand it to every sink
+            progress = st.empty()
+            stats = ingest.run(
+                ingest.iter_chunks(uploaded_file, file_kind, chunk_rows, dtype=column_dtypes),
+                sinks,
+                plan=plan,
+                progress=lambda rows: progress.caption(f"{rows:,} rows processed..."),
+            )
+            progress.caption(f"{stats['rows']:,} rows in {stats['chunks']} chunks, {stats['seconds']:.1f}s ({stats['rows_per_second']:,.0f} rows/s)")
+            return stats
+
+        st.header('Data export to SQL Database')
+
+        # Uploads go through the Snowpark session's write_pandas, reads through the shared db pool.
+        # The session is only opened when something is exported, the page renders without Snowflake.
+        def snowpark_writer():
+            session = st.experimental_connection("snowpark").session
+            return ingest.SnowparkWriter(session, database = "AIRBYTE_DATABASE", schema = "FINANCE")
+
+        option = st.selectbox(
+        "Select Table",
+        ("Create table and insert data", "Insert into already existing table"),
+        index=None,
+        placeholder="Choose existing table or create new",
+        )
+
+        if option == "Create table and insert data":
+            tablename_input = st.text_input('Enter Table Name')
+            if st.button('Update to SQL Database'):        
+                # Create a new table with the provided name, it replaces an existing one only once every chunk is staged
+                try:
+                    stream_upload([ingest.TableSink(snowpark_writer(), tablename_input.upper(), mode = "replace")])
+                except Exception as e:
+                    st.error(f"Table {tablename_input} was not created: {e}")
+                else:
+                    st.write(f"Table '{tablename_input}' was created and data was inserted!")
+                finally:
+                    query_cache.get_query_cache().invalidate("AIRBYTE_DATABASE.FINANCE." + tablename_input.upper())
+
+
+        elif option == "Insert into already existing table":        
+            existing_tables = db.get_database().query('SHOW TABLES IN AIRBYTE_DATABASE.FINANCE;')['name'].to_list()
+            selected_table = st.selectbox("Select Existing Table", existing_tables)
+            # Append only adds the new rows, upsert replaces the rows whose key is in the upload.
+            # Neither reads the existing table back.
+            write_mode = st.radio("Write mode", ("Append", "Upsert on key"), horizontal = True)
+            key_columns = []
+            if write_mode == "Upsert on key":
+                key_columns = st.multiselect("Key columns", dataframe.columns.to_list())
+
+            if st.button('Update to SQL Database'):
+                if write_mode == "Upsert on key" and not key_columns:
+                    st.error("Choose at least one key column to upsert on.")
+                else:
+                    writer = snowpark_writer()
+                    if write_mode == "Append":
+                        sink = ingest.TableSink(writer, selected_table, mode = "append")
+                    else:
+                        sink = ingest.UpsertSink(writer, selected_table, key_columns)
+                    try:
+                        stream_upload([sink])
+                    except Exception as e:
+                        st.error(f"Table {selected_table} was not updated: {e}")
+                    else:
+                        st.success(f"Table {selected_table} was updated!")
+                    finally:
+                        query_cache.get_query_cache().invalidate("AIRBYTE_DATABASE.FINANCE." + selected_table)
+        
+        else:
+            pass
+                
+        st.header('Data export to CSV')
+
+        filename_input = st.text_input('Enter File Name')
+
+        # The CSV is streamed to a temp file chunk by chunk, only when asked for instead of on every rerun
+        if st.button('Prepare CSV'):
+            if st.session_state.get("export_csv_path") and os.path.exists(st.session_state.export_csv_path):
+                os.remove(st.session_state.export_csv_path)
+            csv_sink = ingest.CsvSink()
+            stream_upload([csv_sink])
+            st.session_state.export_csv_path = csv_sink.path
+
+        if st.session_state.get("export_csv_path") and os.path.exists(st.session_state.export_csv_path):
+            with open(st.session_state.export_csv_path, 'rb') as csv:
+                st.download_button(
+                    label="Download Dataframe as CSV",
+                    data=csv,
+                    file_name=filename_input if filename_input.lower().endswith('.csv') else filename_input+'.csv',
+                    mime='text/csv',
+                )
+
+        st.header('Describe sample dataset the simple way')
+        
+        def describeDF(df):
+            
+            st.write("Here's some stats about the loaded data:")
+            numeric_types = ['int64', 'float64']
+            numeric_columns = df.select_dtypes(include=numeric_types).columns.tolist()
+
+            # Get categorical columns
+            categorical_types = ['object']
+            categorical_columns = df.select_dtypes(include=categorical_types).columns.tolist()
+
+            st.write("Relational schema:")
+        
+            columns = df.columns.tolist()
+            st.write(columns)
+            
+            col1, col2, = st.columns(2)
+            with col1:
+                st.write('Numeric columns:\t', numeric_columns)
+
+            with col2:
+                st.write('Categorical columns:\t', categorical_columns)
+            
+            # Calculte statistics for our dataset
+            st.dataframe(df.describe(include='all'), use_container_width=True)
+
+        if st.button('Analyze Data Sample'):
+            with st.spinner('Analyzing dataset...'):
+                time.sleep(1)
+                describeDF(dataframe)
+
+        st.header('Describe sample dataset with OpenAI API')
+
+        if st.button('Analyze Data Sample with LLMs'):
+            with st.spinner('Analyzing dataset...'):
+                df_prompt = f"Give basic analytics on this dataframe: {dataframe}. This could include counts, sums, and averages. As well as overall sentences on any trends or conclusions that can be made after viewing the data. There should be multiple facts you give."
+                openai.api_key = st.secrets.OPENAI_API_KEY
+                # completion = openai.Completion.create(model="text-davinci-003", prompt = df_prompt, n = 10, max_tokens = 400, stop = None, temperature = 0.1)
+                # text_list = [choice.text for choice in completion.choices]
+                # st.write('\n'.join(text_list))
+                # Not streamed, the whole answer is the first token
+                with tracing.span("llm.completion", model="gpt-3.5-turbo"):
+                    completion = openai.ChatCompletion.create(model="gpt-3.5-turbo", messages=[
+                        {"role": "system", "content": "You are a helpful assistant, skilled in data analysis and describing dataframes."},
+                        {"role": "user", "content": df_prompt}])
+                st.success(completion.choices[0].message["content"])
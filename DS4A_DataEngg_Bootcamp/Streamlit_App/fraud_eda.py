@@ -0,0 +1,96 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import fraud_model
+from atomic_file import atomic_write
+
+# Bump when the cube layout changes so old files are rebuilt instead of misread
+CUBE_VERSION = 1
+CUBE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fraud_eda_cube.parquet")
+
+# Dimensions the page charts fraud counts by, ranked ones keep only their top values
+DIMENSIONS = ['Merchant State', 'Merchant City', 'Year', 'Month', 'Day', 'Day of Week', 'Hour', 'Use Chip']
+RANKED_DIMENSIONS = {'Merchant State': 30, 'Merchant City': 30}
+AMOUNT_BINS = 80
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    # Fraud counts per value of every dimension plus an Amount histogram, in one long table of
+    # (dimension, value, position, count[, bin_start, bin_end]) rows. position keeps the chart order:
+    # by count for ranked dimensions, by value for the rest.
+    fraud = df[df[fraud_model.TARGET_COLUMN] == 1]
+    parts = []
+    for dimension in DIMENSIONS:
+        counts = fraud[dimension].value_counts()
+        counts = counts[counts > 0]
+        if dimension in RANKED_DIMENSIONS:
+            counts = counts.head(RANKED_DIMENSIONS[dimension])
+        else:
+            counts = counts.sort_index()
+        parts.append(pd.DataFrame({
+            'dimension': dimension,
+            'value': counts.index.astype(str),
+            'position': np.arange(len(counts)),
+            'count': counts.to_numpy(dtype=np.int64),
+        }))
+
+    counts, edges = np.histogram(fraud['Amount'].to_numpy(dtype=np.float64), bins=AMOUNT_BINS)
+    parts.append(pd.DataFrame({
+        'dimension': 'Amount',
+        'value': [f"{start:.2f}" for start in edges[:-1]],
+        'position': np.arange(len(counts)),
+        'count': counts.astype(np.int64),
+        'bin_start': edges[:-1],
+        'bin_end': edges[1:],
+    }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def cube_metadata(path: str = CUBE_PATH):
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata[b"fraud_eda_cube"]) if b"fraud_eda_cube" in metadata else None
+
+
+def save_cube(cube: pd.DataFrame, stamp: dict, path: str = CUBE_PATH):
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b"fraud_eda_cube": json.dumps(stamp).encode()})
+    with atomic_write(path) as tmp_path:
+        pq.write_table(table, tmp_path)
+
+
+def load_cube(data_path: str = fraud_model.DATA_PATH, path: str = CUBE_PATH):
+    # Returns the cube and its stamp. Rebuilt from the prepared transactions only when the
+    # source file changed, so reading it costs the same whatever the number of transactions.
+    stamp = cube_metadata(path)
+    source_fingerprint = fraud_model.data_fingerprint(data_path)
+    current = stamp is not None and stamp.get("version") == CUBE_VERSION
+    if current and (source_fingerprint is None or stamp.get("source_fingerprint") == source_fingerprint):
+        return pd.read_parquet(path), stamp
+    df = fraud_model.load_transactions(data_path)
+    stamp = {
+        "version": CUBE_VERSION,
+        "source_fingerprint": source_fingerprint,
+        "transactions": int(len(df)),
+        "fraudulent": int(df[fraud_model.TARGET_COLUMN].sum()),
+    }
+    cube = build_cube(df)
+    save_cube(cube, stamp, path)
+    return cube, stamp
+
+
+def counts(cube: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    # One chart's rows, as [dimension, 'count'] in chart order
+    rows = cube[cube['dimension'] == dimension].sort_values('position')
+    return rows[['value', 'count']].rename(columns={'value': dimension}).reset_index(drop=True)
+
+
+def amount_histogram(cube: pd.DataFrame) -> pd.DataFrame:
+    rows = cube[cube['dimension'] == 'Amount'].sort_values('position')
+    return rows[['bin_start', 'bin_end', 'count']].reset_index(drop=True)
@@ -0,0 +1,380 @@
+import hashlib
+import json
+import math
+import os
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from imblearn.under_sampling import RandomUnderSampler
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report, confusion_matrix, f1_score
+from sklearn.model_selection import GridSearchCV, ParameterGrid, StratifiedKFold, train_test_split
+
+import tracing
+from atomic_file import atomic_write
+
+# Bump when the artifact layout changes so old files are retrained instead of misread
+ARTIFACT_VERSION = 3
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Project 2", "Data_Files", "credit_card_transaction_data_de.parquet")
+ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fraud_model.joblib")
+# Compact copy of DATA_PATH with only the columns the page and the model read, rebuilt when the source changes
+PREPARED_VERSION = 1
+PREPARED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fraud_transactions.parquet")
+
+DAYS = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
+FEATURE_COLUMNS = ['Year', 'Hour', 'Day of Week', 'Amount', 'Use Chip', 'Merchant Name', 'MCC']
+TARGET_COLUMN = 'Is Fraud?'
+SOURCE_COLUMNS = ['Year', 'Month', 'Day', 'Time', 'Amount', 'Use Chip', 'Merchant Name', 'Merchant City', 'Merchant State', 'MCC', TARGET_COLUMN]
+CATEGORY_COLUMNS = ['Use Chip', 'Merchant City', 'Merchant State']
+COMPACT_DTYPES = {'Year': np.int16, 'Month': np.int8, 'Day': np.int8, 'MCC': np.int16}
+
+# Undersampled to 40,000 transactions, 20% of them fraudulent
+TOTAL_SAMPLES = 40000
+FRAUD_PROPORTION = 0.2
+
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [None, 10, 20, 30],
+    'max_features': ['sqrt', 'log2'],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'bootstrap': [True, False]
+}
+
+# Successive halving: every round grows the surviving forests to the next size and keeps the best 1/HALVING_FACTOR
+HALVING_CANDIDATES = 27
+HALVING_FACTOR = 3
+DEFAULT_SEARCH_BUDGET_SECONDS = 600
+
+
+def data_fingerprint(path: str = DATA_PATH):
+    # Size and modification time are enough to notice a replaced file without reading it
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return hashlib.sha256(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+def engineer(df: pd.DataFrame) -> pd.DataFrame:
+    # Column-at-a-time feature engineering shared by the prep stage and scoring, works on any batch size.
+    # Amount becomes float32, flags and small integers int8/int16 and repeated strings categoricals.
+    # Merchant Name is a numeric merchant id the model reads as a number, it stays an integer.
+    amount = df["Amount"]
+    if not pd.api.types.is_numeric_dtype(amount):
+        amount = amount.astype(str).str.replace("$", "", regex=False)
+    df["Amount"] = amount.astype(np.float32)
+    df["Hour"] = df["Time"].str[0:2].astype(np.int8)
+    dates = pd.to_datetime(df[['Year', 'Month', 'Day']])
+    df['Day of Week'] = pd.Categorical(dates.dt.dayofweek.map(DAYS), categories=list(DAYS.values()))
+    df = df.drop(['Time'], axis=1)
+    df = df.astype({col: dtype for col, dtype in COMPACT_DTYPES.items() if col in df.columns})
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if TARGET_COLUMN in df.columns:
+        df[TARGET_COLUMN] = (df[TARGET_COLUMN] == 'Yes').astype(np.int8)
+    return df
+
+
+def prepare(df: pd.DataFrame) -> pd.DataFrame:
+    # In-memory version of build_prepared(), for frames that are not read from a file
+    return engineer(df.loc[df['Merchant State'] != 'Italy', SOURCE_COLUMNS].copy())
+
+
+def read_source(path: str = DATA_PATH) -> pd.DataFrame:
+    # Only SOURCE_COLUMNS are read and the Italy rows are dropped inside the Parquet scan.
+    # Transactions without a state are kept, like the pandas != filter did.
+    state = pc.field('Merchant State')
+    return pq.read_table(path, columns=SOURCE_COLUMNS, filters=(state != 'Italy') | state.is_null()).to_pandas()
+
+
+def prepared_metadata(prepared_path: str = PREPARED_PATH):
+    if not os.path.exists(prepared_path):
+        return None
+    metadata = pq.read_schema(prepared_path).metadata or {}
+    return json.loads(metadata[b"fraud_prepared"]) if b"fraud_prepared" in metadata else None
+
+
+def build_prepared(path: str = DATA_PATH, prepared_path: str = PREPARED_PATH) -> pd.DataFrame:
+    df = engineer(read_source(path))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    stamp = {"version": PREPARED_VERSION, "source_fingerprint": data_fingerprint(path)}
+    table = table.replace_schema_metadata({**table.schema.metadata, b"fraud_prepared": json.dumps(stamp).encode()})
+    with atomic_write(prepared_path) as tmp_path:
+        pq.write_table(table, tmp_path, compression="zstd")
+    return df
+
+
+def load_transactions(path: str = DATA_PATH, prepared_path: str = PREPARED_PATH) -> pd.DataFrame:
+    # The string parsing runs once per source file, every later load reads the typed copy
+    stamp = prepared_metadata(prepared_path)
+    current = stamp is not None and stamp.get("version") == PREPARED_VERSION
+    source_fingerprint = data_fingerprint(path)
+    if current and (source_fingerprint is None or stamp.get("source_fingerprint") == source_fingerprint):
+        return pd.read_parquet(prepared_path)
+    return build_prepared(path, prepared_path)
+
+
+class FraudFeatureEncoder(BaseEstimator, TransformerMixin):
+    # Learns the Amount scaling and the Use Chip / Day of Week categories once, on the training data,
+    # so scoring encodes exactly like training did. Categories are binary encoded like
+    # ce.BinaryEncoder: each one gets a code 1..n written as bits, unseen values are all zeros.
+
+    numeric_columns = ['Year', 'Hour', 'Merchant Name', 'MCC']
+    scaled_columns = ['Amount']
+    binary_columns = ['Use Chip', 'Day of Week']
+
+    def fit(self, X, y=None):
+        amount = X['Amount'].to_numpy(dtype=np.float64)
+        self.amount_mean_ = float(amount.mean())
+        self.amount_scale_ = float(amount.std()) or 1.0
+        self.categories_ = {col: sorted(X[col].dropna().unique().tolist()) for col in self.binary_columns}
+        self.bits_ = {col: max(1, math.ceil(math.log2(len(cats) + 1))) for col, cats in self.categories_.items()}
+        return self
+
+    def get_feature_names_out(self, input_features=None):
+        names = self.numeric_columns + self.scaled_columns
+        for col in self.binary_columns:
+            names = names + [f"{col}_{i}" for i in range(self.bits_[col])]
+        return np.array(names, dtype=object)
+
+    def transform(self, X):
+        # One float32 matrix allocated up front and filled column by column. The forest's trees
+        # split on float32 anyway, so nothing is lost against the float64 frame clean() used to build.
+        out = np.empty((len(X), len(self.get_feature_names_out())), dtype=np.float32)
+        for i, col in enumerate(self.numeric_columns):
+            out[:, i] = X[col].astype(np.float32).to_numpy()
+        i = len(self.numeric_columns)
+        out[:, i] = (X['Amount'].to_numpy(dtype=np.float64) - self.amount_mean_) / self.amount_scale_
+        i += 1
+        for col in self.binary_columns:
+            bits = self.bits_[col]
+            codes = pd.Categorical(X[col], categories=self.categories_[col]).codes.astype(np.int64) + 1
+            shifts = np.arange(bits - 1, -1, -1)
+            out[:, i:i + bits] = (codes[:, None] >> shifts) & 1
+            i += bits
+        return out
+
+
+def evaluate(model, X_test, y_test) -> dict:
+    y_pred = model.predict(X_test)
+    return {
+        "report": classification_report(y_test, y_pred),
+        "f1_macro": float(f1_score(y_test, y_pred, average='macro')),
+        "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
+    }
+
+
+def grid_search(X_train, y_train, param_grid: dict = None):
+    # Exhaustive, every combination is fitted cv=3 times from scratch
+    search = GridSearchCV(estimator=RandomForestClassifier(random_state=42), param_grid=param_grid or PARAM_GRID,
+                          cv=3, n_jobs=-1, verbose=0, scoring='f1_macro')
+    with tracing.span("model.fit", model="grid_search", rows=len(X_train)):
+        search.fit(X_train, y_train)
+    results = search.cv_results_
+    candidates = [
+        {
+            "params": params,
+            "n_estimators": params['n_estimators'],
+            "f1_macro": float(score),
+            "seconds": float((fit_time + score_time) * search.n_splits_),
+        }
+        for params, score, fit_time, score_time in zip(results['params'], results['mean_test_score'], results['mean_fit_time'], results['mean_score_time'])
+    ]
+    return search.best_estimator_, search.best_params_, candidates
+
+
+def halving_search(X_train, y_train, param_grid: dict = None, budget_seconds: float = DEFAULT_SEARCH_BUDGET_SECONDS,
+                   n_candidates: int = HALVING_CANDIDATES, factor: int = HALVING_FACTOR, cv: int = 3):
+    # Samples n_candidates from the grid and races them over its n_estimators values. The forests are
+    # warm-started, so growing a survivor from 50 to 100 trees only fits the 50 new ones. Stops early
+    # when the budget runs out and refits the winner on the whole training set.
+    param_grid = dict(param_grid or PARAM_GRID)
+    sizes = sorted(param_grid.pop('n_estimators', [100]))
+    rng = np.random.default_rng(1613)
+    grid = list(ParameterGrid(param_grid))
+    sampled = [grid[i] for i in rng.choice(len(grid), min(n_candidates, len(grid)), replace=False)]
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=1613).split(X_train, y_train))
+    X_values, y_values = np.asarray(X_train), np.asarray(y_train)
+
+    started = time.perf_counter()
+    forests = {i: [RandomForestClassifier(random_state=42, warm_start=True, n_jobs=-1, **params) for _ in folds] for i, params in enumerate(sampled)}
+    seconds = {i: 0.0 for i in forests}
+    candidates = []
+    scores = {}
+    survivors = list(forests)
+    for size in sizes:
+        round_scores = {}
+        for i in survivors:
+            if budget_seconds is not None and round_scores and time.perf_counter() - started > budget_seconds:
+                break
+            fitted = time.perf_counter()
+            fold_scores = []
+            with tracing.span("model.fit", model="candidate", n_estimators=size, rows=len(X_values)):
+                for forest, (train_idx, test_idx) in zip(forests[i], folds):
+                    forest.set_params(n_estimators=size)
+                    forest.fit(X_values[train_idx], y_values[train_idx])
+                    fold_scores.append(f1_score(y_values[test_idx], forest.predict(X_values[test_idx]), average='macro'))
+            seconds[i] += time.perf_counter() - fitted
+            round_scores[i] = float(np.mean(fold_scores))
+            candidates.append({"params": {**sampled[i], 'n_estimators': size}, "n_estimators": size, "f1_macro": round_scores[i], "seconds": seconds[i]})
+        scores, best_size = round_scores, size
+        survivors = sorted(round_scores, key=round_scores.get, reverse=True)[:max(1, math.ceil(len(round_scores) / factor))]
+        # Eliminated candidates never fit again, let their cv forests go before the next rung grows the survivors
+        for i in set(forests) - set(survivors):
+            forests.pop(i)
+        if len(survivors) == 1 or (budget_seconds is not None and time.perf_counter() - started > budget_seconds):
+            break
+
+    best = max(scores, key=scores.get)
+    best_params = {**sampled[best], 'n_estimators': best_size}
+    with tracing.span("model.fit", model="best", rows=len(X_train)):
+        best_rf = RandomForestClassifier(random_state=42, n_jobs=-1, **best_params).fit(X_train, y_train)
+    return best_rf, best_params, candidates
+
+
+SEARCHES = {"grid": grid_search, "halving": halving_search}
+
+
+def train(path: str = DATA_PATH, param_grid: dict = None, df: pd.DataFrame = None, search: str = "halving", **search_options) -> dict:
+    # Offline: undersample, fit the baseline forest and run the hyperparameter search, keep everything the page shows
+    started = time.perf_counter()
+    if df is None:
+        df = load_transactions(path)
+
+    fraud_samples = int(TOTAL_SAMPLES * FRAUD_PROPORTION)
+    rus = RandomUnderSampler(sampling_strategy={0: TOTAL_SAMPLES - fraud_samples, 1: fraud_samples}, random_state=1613)
+    X_resampled, y_resampled = rus.fit_resample(df[FEATURE_COLUMNS], df[TARGET_COLUMN])
+    X_train, X_test, y_train, y_test = train_test_split(X_resampled, y_resampled, test_size=0.3, random_state=1613)
+
+    # Fitted on the training split only, the test split and new transactions are encoded with its state
+    preprocessing = FraudFeatureEncoder().fit(X_train)
+    features = list(preprocessing.get_feature_names_out())
+    X_train, X_test = preprocessing.transform(X_train), preprocessing.transform(X_test)
+
+    baseline = RandomForestClassifier(n_estimators=100, random_state=42)
+    with tracing.span("model.fit", model="baseline", rows=len(X_train)):
+        baseline.fit(X_train, y_train)
+
+    search_started = time.perf_counter()
+    with tracing.span("model.search", mode=search):
+        best_rf, best_params, candidates = SEARCHES[search](X_train, y_train, param_grid, **search_options)
+    search_seconds = time.perf_counter() - search_started
+
+    importances = pd.DataFrame({'Features': features, 'Feature Importance': best_rf.feature_importances_})
+    return {
+        "version": ARTIFACT_VERSION,
+        "data_fingerprint": data_fingerprint(path),
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "train_seconds": time.perf_counter() - started,
+        "preprocessing": preprocessing,
+        "model": best_rf,
+        "features": features,
+        "best_params": best_params,
+        "search": {"mode": search, "seconds": search_seconds, "candidates": candidates},
+        "metrics": {
+            "baseline": evaluate(baseline, X_test, y_test),
+            "best": evaluate(best_rf, X_test, y_test),
+        },
+        "importances": importances.sort_values(by='Feature Importance'),
+    }
+
+
+def _synthetic_transactions(rows: int) -> pd.DataFrame:
+    # Raw transactions shaped like credit_card_transaction_data_de.parquet, fraud leans towards
+    # large online purchases at night so the forest has something to learn
+    rng = np.random.default_rng(1613)
+    use_chip = rng.choice(['Swipe Transaction', 'Chip Transaction', 'Online Transaction'], rows, p=[0.5, 0.35, 0.15])
+    hour = rng.integers(0, 24, rows)
+    amount = np.round(rng.lognormal(3.5, 1.2, rows) * np.where(rng.random(rows) < 0.05, -1, 1), 2)
+    risk = 0.01 + 0.15 * (use_chip == 'Online Transaction') + 0.1 * ((hour < 6) | (hour > 22)) + 0.1 * (amount > 200)
+    return pd.DataFrame({
+        'User': rng.integers(0, 2000, rows),
+        'Card': rng.integers(0, 9, rows),
+        'Year': rng.integers(2005, 2020, rows),
+        'Month': rng.integers(1, 13, rows),
+        'Day': rng.integers(1, 29, rows),
+        'Time': pd.Series(hour).map('{:02d}'.format) + ':' + pd.Series(rng.integers(0, 60, rows)).map('{:02d}'.format),
+        'Amount': pd.Series(amount).map('${:.2f}'.format),
+        'Use Chip': use_chip,
+        'Merchant Name': rng.integers(-9 * 10**18, 9 * 10**18, rows),
+        'Merchant City': rng.choice(['La Verne', 'Monterey Park', 'Mira Loma', 'ONLINE', 'Houston', 'Rome'], rows),
+        'Merchant State': rng.choice(['CA', 'TX', 'NY', 'Italy', None], rows, p=[0.4, 0.3, 0.2, 0.02, 0.08]),
+        'Zip': rng.integers(10000, 99999, rows).astype(float),
+        'MCC': rng.choice([5300, 5411, 5499, 5812, 5912, 7538], rows),
+        'Errors?': None,
+        'Is Fraud?': np.where(rng.random(rows) < risk, 'Yes', 'No'),
+    })
+
+
+def load_artifact(path: str = ARTIFACT_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except (AttributeError, ImportError):
+        # Pickled against classes or functions this module no longer has, retrain it
+        return None
+
+
+def save_artifact(artifact: dict, path: str = ARTIFACT_PATH):
+    with atomic_write(path) as tmp_path:
+        joblib.dump(artifact, tmp_path)
+
+
+def is_current(artifact, current_fingerprint) -> bool:
+    if artifact is None or artifact.get("version") != ARTIFACT_VERSION:
+        return False
+    # Without the transaction file next to the app there is nothing to compare against, keep the artifact
+    return current_fingerprint is None or artifact.get("data_fingerprint") == current_fingerprint
+
+
+# do `python fraud_model.py` to train and save the model the ML Fraud Detection page shows,
+# and `python fraud_model.py --check` to see whether the saved one matches the data
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the fraud detection model offline")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--artifact", default=ARTIFACT_PATH)
+    parser.add_argument("--synthetic", action="store_true", help="train on generated transactions when --data does not exist, for trying the page out")
+    parser.add_argument("--rows", type=int, default=500_000, help="synthetic transactions to train on with --synthetic")
+    parser.add_argument("--search", choices=sorted(SEARCHES), default="halving", help="grid is the exhaustive search, halving the budgeted one")
+    parser.add_argument("--budget", type=float, default=DEFAULT_SEARCH_BUDGET_SECONDS, help="seconds the halving search may spend")
+    parser.add_argument("--check", action="store_true", help="only report whether the artifact is current")
+    args = parser.parse_args()
+
+    artifact = load_artifact(args.artifact)
+    current_fingerprint = data_fingerprint(args.data)
+    if args.check:
+        if artifact is None:
+            print(f"No artifact at {args.artifact}")
+        else:
+            state = "current" if is_current(artifact, current_fingerprint) else "stale, retrain it"
+            print(f"Artifact v{artifact['version']} trained {artifact['trained_at']}: {state}")
+    else:
+        synthetic = None
+        if not os.path.exists(args.data):
+            # The page cannot tell synthetic metrics from real ones, so they are only trained on when asked for
+            if not args.synthetic:
+                parser.error(f"{args.data} does not exist, pass --synthetic to train on generated transactions instead")
+            synthetic = prepare(_synthetic_transactions(args.rows))
+        options = {"budget_seconds": args.budget} if args.search == "halving" else {}
+        # Trained through the imported module, so the pickled encoder refers to fraud_model and not __main__
+        import fraud_model
+        artifact = fraud_model.train(args.data, df=synthetic, search=args.search, **options)
+        # Flagged so the page warns that the metrics are not from the real transactions
+        artifact["synthetic"] = synthetic is not None
+        save_artifact(artifact, args.artifact)
+        search = artifact["search"]
+        print(f"{search['mode']} search: {len(search['candidates'])} candidates in {search['seconds']:.0f}s")
+        for candidate in sorted(search["candidates"], key=lambda c: c["f1_macro"], reverse=True)[:10]:
+            print(f"  f1_macro {candidate['f1_macro']:.4f}  {candidate['seconds']:6.1f}s  {candidate['params']}")
+        print(f"Trained in {artifact['train_seconds']:.0f}s, test f1_macro {artifact['metrics']['best']['f1_macro']:.3f}, saved to {args.artifact}")
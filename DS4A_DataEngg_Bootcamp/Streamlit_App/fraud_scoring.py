@@ -0,0 +1,90 @@
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import fraud_model
+
+RAW_COLUMNS = ['Year', 'Month', 'Day', 'Time', 'Amount', 'Use Chip', 'Merchant Name', 'MCC']
+# Latencies kept for the percentiles, older batches fall off
+LATENCY_WINDOW = 1000
+
+
+class FraudScorer:
+    # Loads the trained pipeline once and scores batches of raw transactions, i.e. records with the
+    # same columns as credit_card_transaction_data_de.parquet, with the fraud probability of each
+
+    def __init__(self, artifact: dict):
+        self.preprocessing = artifact["preprocessing"]
+        self.model = artifact["model"]
+        self.features = artifact["features"]
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.rows = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def from_path(cls, path: str = fraud_model.ARTIFACT_PATH):
+        artifact = fraud_model.load_artifact(path)
+        if artifact is None:
+            raise FileNotFoundError(f"No trained model at {path}, run `python fraud_model.py` first")
+        return cls(artifact)
+
+    def features_for(self, records) -> np.ndarray:
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+        missing = [c for c in RAW_COLUMNS if c not in df.columns]
+        if missing:
+            raise ValueError(f"Transactions are missing columns: {', '.join(missing)}")
+        # Checked here so a file in another layout is reported as such instead of failing inside engineer()
+        if len(df) and not df['Time'].map(lambda t: isinstance(t, str) and len(t) >= 2 and t[:2].isdigit()).all():
+            raise ValueError("'Time' must be text like 06:21 in every row")
+        not_numeric = [c for c in ['Year', 'Month', 'Day', 'Merchant Name', 'MCC'] if not pd.api.types.is_numeric_dtype(df[c])]
+        if not_numeric:
+            raise ValueError(f"Columns must be numbers: {', '.join(not_numeric)}")
+        df = fraud_model.engineer(df[RAW_COLUMNS].copy())
+        return self.preprocessing.transform(df)
+
+    def score(self, records) -> np.ndarray:
+        started = time.perf_counter()
+        X = self.features_for(records)
+        scores = self.model.predict_proba(X)[:, 1] if len(X) else np.empty(0)
+        seconds = time.perf_counter() - started
+        self.latencies.append(seconds)
+        self.rows += len(X)
+        self.seconds += seconds
+        return scores
+
+    def score_stream(self, batches):
+        # Micro-batches in, one array of scores out per batch
+        for batch in batches:
+            yield self.score(batch)
+
+    def stats(self) -> dict:
+        latencies = np.array(self.latencies) * 1000
+        return {
+            "batches": len(latencies),
+            "rows": self.rows,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "rows_per_second": self.rows / self.seconds if self.seconds else 0.0,
+        }
+
+
+# do `python fraud_scoring.py --batch 100` to measure scoring latency on synthetic transactions
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark fraud scoring on micro-batches")
+    parser.add_argument("--artifact", default=fraud_model.ARTIFACT_PATH)
+    parser.add_argument("--batch", type=int, default=100, help="rows per micro-batch")
+    parser.add_argument("--batches", type=int, default=200)
+    args = parser.parse_args()
+
+    scorer = FraudScorer.from_path(args.artifact)
+    transactions = fraud_model._synthetic_transactions(args.batch * args.batches)
+    batches = (transactions.iloc[i:i + args.batch] for i in range(0, len(transactions), args.batch))
+    for _ in scorer.score_stream(batches):
+        pass
+    stats = scorer.stats()
+    print(f"{stats['rows']:,} rows in {stats['batches']} batches of {args.batch}: "
+          f"p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms, {stats['rows_per_second']:,.0f} rows/s")
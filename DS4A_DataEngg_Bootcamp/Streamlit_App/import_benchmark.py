@@ -0,0 +1,65 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SHELL = ["importlib", "streamlit"]
+PAGES = {
+    "Visualizations": ["retail_visualizations"],
+    "Chatbot": ["retail_chatbot"],
+    "Data Ingestion Tool": ["finance_ingestion"],
+    "ML Fraud Detection": ["finance_fraud"],
+}
+# What a cold start imports: the shell Hello.py always loads, the shell plus the one page being opened,
+# and every page at once, which is what Hello.py imported before the pages were split out
+TARGETS = {
+    "shell (Hello.py)": SHELL,
+    **{f"shell + {page}": SHELL + modules for page, modules in PAGES.items()},
+    "every page": SHELL + [module for modules in PAGES.values() for module in modules],
+}
+
+
+def import_times(modules: list) -> dict:
+    # Runs the imports in a fresh interpreter with -X importtime and returns the microseconds spent
+    # in each top-level package (pandas, sklearn, plotly, ...), i.e. what the modules cost on a cold start
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {module}" for module in modules)],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            package = name.strip().split(".")[0]
+            times[package] = times.get(package, 0) + int(own)
+    return times
+
+
+def measure(modules: list, repeats: int):
+    # Median over `repeats` runs of the total, the heaviest packages are taken from the last run
+    totals = []
+    for _ in range(repeats):
+        times = import_times(modules)
+        totals.append(sum(times.values()))
+    return statistics.median(totals) / 1000, sorted(times.items(), key=lambda item: item[1], reverse=True)
+
+
+# do `python import_benchmark.py` to see what each page costs to import on a cold start
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the cold-start import time of the app shell and of each page")
+    parser.add_argument("--repeats", type=int, default=3, help="fresh interpreters per target, the median is reported")
+    parser.add_argument("--top", type=int, default=5, help="heaviest packages listed per target")
+    args = parser.parse_args()
+
+    for target, modules in TARGETS.items():
+        total_ms, heaviest = measure(modules, args.repeats)
+        print(f"{target}: {total_ms:,.0f}ms")
+        for name, microseconds in heaviest[:args.top]:
+            print(f"    {name:<40}{microseconds / 1000:>8,.0f}ms")
@@ -0,0 +1,316 @@
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import tracing
+
+DEFAULT_CHUNK_ROWS = 100_000
+PREVIEW_ROWS = 1000
+# CSV exports are only kept until the download, whatever a session left behind is removed after this
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "bigsupplyco_exports")
+EXPORT_MAX_AGE_SECONDS = 6 * 3600
+
+
+def file_kind(name: str) -> str:
+    return "parquet" if name.lower().endswith(".parquet") else "csv"
+
+
+def iter_chunks(file, kind: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, dtype: dict = None):
+    # CSVs are read chunk_rows at a time and Parquet files batch by batch within their row groups,
+    # so only one chunk of the upload is ever held as a DataFrame.
+    # Pass csv_dtypes() of the preview as dtype so every CSV chunk gets the same column types.
+    if hasattr(file, "seek"):
+        file.seek(0)
+    if kind == "csv":
+        yield from pd.read_csv(file, encoding="utf-8", chunksize=chunk_rows, dtype=dtype)
+    else:
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+
+
+def count_rows(file, kind: str):
+    # Free for Parquet (footer metadata), unknown for CSV without reading it all
+    if kind != "parquet":
+        return None
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return pq.ParquetFile(file).metadata.num_rows
+
+
+def preview(file, kind: str, rows: int = PREVIEW_ROWS) -> pd.DataFrame:
+    return next(iter_chunks(file, kind, rows), pd.DataFrame())
+
+
+def csv_dtypes(sample: pd.DataFrame) -> dict:
+    # pandas infers types per chunk, while the table is created from the first chunk's types.
+    # Integers are read as nullable Int64 so a later empty cell does not turn them into floats,
+    # columns empty in the sample are read as strings.
+    dtypes = {}
+    for column, dtype in sample.dtypes.items():
+        if sample[column].isna().all():
+            dtypes[column] = "string"
+        elif pd.api.types.is_bool_dtype(dtype):
+            dtypes[column] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[column] = "Int64"
+        else:
+            dtypes[column] = dtype
+    return dtypes
+
+
+def remove_stale_exports(directory: str = EXPORT_DIR, max_age_seconds: float = EXPORT_MAX_AGE_SECONDS):
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age_seconds
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            # Another session removed it first
+            pass
+
+
+class CsvSink:
+    # Appends each chunk to a CSV file on disk, the header is written once.
+    # Without a path the file goes to EXPORT_DIR, where old exports are swept on every new one.
+
+    def __init__(self, path: str = None):
+        if path is None:
+            remove_stale_exports()
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            fd, path = tempfile.mkstemp(suffix=".csv", dir=EXPORT_DIR)
+            os.close(fd)
+        self.path = path
+        self._first = True
+
+    def write(self, chunk: pd.DataFrame):
+        chunk.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+def quote_identifier(name: str) -> str:
+    # write_pandas quotes every identifier, so "Card Number" has to be referenced the same way
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SnowparkWriter:
+    def __init__(self, session, database: str, schema: str):
+        self.session = session
+        self.database = database
+        self.schema = schema
+
+    def qualified(self, table_name: str) -> str:
+        return ".".join(quote_identifier(part) for part in (self.database, self.schema, table_name))
+
+    def write(self, df: pd.DataFrame, table_name: str, overwrite: bool):
+        with tracing.span("snowpark.write_pandas", table=table_name, rows=len(df), bytes=tracing.frame_bytes(df)):
+            self.session.write_pandas(df, table_name, database=self.database, schema=self.schema, auto_create_table=True, overwrite=overwrite)
+
+    def execute(self, sql: str):
+        with tracing.span("snowpark.sql", sql=sql.strip()[:200]) as sql_span:
+            rows = self.session.sql(sql).collect()
+            sql_span.set(rows=len(rows))
+            return rows
+
+    @contextmanager
+    def transaction(self):
+        self.execute("BEGIN")
+        try:
+            yield
+        except Exception:
+            self.execute("ROLLBACK")
+            raise
+        self.execute("COMMIT")
+
+    def replace_table(self, stage_name: str, table_name: str):
+        # A single statement, readers see the old table until the clone of the staged one replaces it
+        self.execute(f"CREATE OR REPLACE TABLE {self.qualified(table_name)} CLONE {self.qualified(stage_name)}")
+
+
+class LocalWriter:
+    # sqlite3 or duckdb stand-in for SnowparkWriter, so the append and upsert paths run offline
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.is_sqlite = isinstance(conn, sqlite3.Connection)
+
+    def qualified(self, table_name: str) -> str:
+        return quote_identifier(table_name)
+
+    def write(self, df: pd.DataFrame, table_name: str, overwrite: bool):
+        if self.is_sqlite:
+            df.to_sql(table_name, self.conn, if_exists="replace" if overwrite else "append", index=False)
+            return
+        table = self.qualified(table_name)
+        columns = ", ".join(quote_identifier(c) for c in df.columns)
+        self.conn.register("ingest_chunk", df)
+        try:
+            if overwrite:
+                self.conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM ingest_chunk")
+            else:
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM ingest_chunk WHERE 1 = 0")
+                self.conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM ingest_chunk")
+        finally:
+            self.conn.unregister("ingest_chunk")
+
+    def execute(self, sql: str):
+        return self.conn.execute(sql).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        if self.is_sqlite:
+            with self.conn:
+                # sqlite3 only opens a transaction by itself before DML, DDL would autocommit
+                if not self.conn.in_transaction:
+                    self.conn.execute("BEGIN")
+                yield
+            return
+        self.conn.begin()
+        try:
+            yield
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def replace_table(self, stage_name: str, table_name: str):
+        # DDL is transactional in sqlite and duckdb, readers see the old table or the new one
+        with self.transaction():
+            self.execute(f"DROP TABLE IF EXISTS {self.qualified(table_name)}")
+            self.execute(f"ALTER TABLE {self.qualified(stage_name)} RENAME TO {self.qualified(table_name)}")
+
+
+class TableSink:
+    # Chunks land in a staging table, the target is only touched once the whole upload is staged,
+    # so a failed upload leaves it as it was and a retry does not add the same rows twice.
+    # mode="replace": the staging table replaces the table.
+    # mode="append": one INSERT ... SELECT adds the staged rows, the existing rows are never read or rewritten.
+
+    def __init__(self, writer, table_name: str, mode: str = "replace"):
+        self.writer = writer
+        self.table_name = table_name
+        self.replace = mode == "replace"
+        self.stage_name = f"{table_name}_STAGE_{uuid.uuid4().hex[:8].upper()}"
+        self.columns = None
+        self._first = True
+
+    def write(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        self.writer.write(chunk, self.stage_name, overwrite=self._first)
+        self._first = False
+
+    def close(self):
+        if self._first:
+            return
+        try:
+            if self.replace:
+                self.writer.replace_table(self.stage_name, self.table_name)
+            else:
+                columns = ", ".join(quote_identifier(c) for c in self.columns)
+                with self.writer.transaction():
+                    self.writer.execute(f"INSERT INTO {self.writer.qualified(self.table_name)} ({columns}) SELECT {columns} FROM {self.writer.qualified(self.stage_name)}")
+        finally:
+            self.abort()
+
+    def abort(self):
+        self.writer.execute(f"DROP TABLE IF EXISTS {self.writer.qualified(self.stage_name)}")
+
+
+class UpsertSink:
+    # Chunks land in a staging table, then one transaction deletes the target rows whose key is
+    # staged and inserts the staged rows, keeping the last occurrence of each key in the upload
+
+    ROW_COLUMN = "_INGEST_ROW"
+
+    def __init__(self, writer, table_name: str, key: list):
+        if not key:
+            raise ValueError("An upsert needs at least one key column")
+        self.writer = writer
+        self.table_name = table_name
+        self.key = list(key)
+        self.stage_name = f"{table_name}_STAGE_{uuid.uuid4().hex[:8].upper()}"
+        self.columns = None
+        self._rows = 0
+        self._first = True
+
+    def write(self, chunk: pd.DataFrame):
+        missing = [k for k in self.key if k not in chunk.columns]
+        if missing:
+            raise ValueError(f"Key columns not in the upload: {', '.join(missing)}")
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        chunk = chunk.assign(**{self.ROW_COLUMN: range(self._rows, self._rows + len(chunk))})
+        self.writer.write(chunk, self.stage_name, overwrite=self._first)
+        self._rows += len(chunk)
+        self._first = False
+
+    def merge_statements(self) -> list:
+        target = self.writer.qualified(self.table_name)
+        stage = self.writer.qualified(self.stage_name)
+        columns = ", ".join(quote_identifier(c) for c in self.columns)
+        keys = ", ".join(quote_identifier(k) for k in self.key)
+        # NULL-safe, an upload row with an empty key replaces the target row with the same empty key
+        # instead of being added next to it, like ROW_NUMBER() below treats NULL keys as one group
+        key_match = " AND ".join(f"{stage}.{quote_identifier(k)} IS NOT DISTINCT FROM {target}.{quote_identifier(k)}" for k in self.key)
+        return [
+            f"DELETE FROM {target} WHERE EXISTS (SELECT 1 FROM {stage} WHERE {key_match})",
+            f"""INSERT INTO {target} ({columns})
+SELECT {columns} FROM (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY {keys} ORDER BY {quote_identifier(self.ROW_COLUMN)} DESC) AS "_INGEST_RANK"
+    FROM {stage}
+) AS ranked
+WHERE "_INGEST_RANK" = 1""",
+        ]
+
+    def close(self):
+        if self._first:
+            return
+        try:
+            with self.writer.transaction():
+                for statement in self.merge_statements():
+                    self.writer.execute(statement)
+        finally:
+            self.abort()
+
+    def abort(self):
+        self.writer.execute(f"DROP TABLE IF EXISTS {self.writer.qualified(self.stage_name)}")
+
+
+def run(chunks, sinks: list, plan=None, progress=None) -> dict:
+    # Streams every chunk through the transformation plan into every sink, peak memory is one chunk
+    stats = {"rows": 0, "chunks": 0, "seconds": 0.0, "rows_per_second": 0.0}
+    started = time.perf_counter()
+    try:
+        for chunk in chunks:
+            if plan is not None:
+                chunk, _ = plan.apply(chunk)
+            for sink in sinks:
+                sink.write(chunk)
+            stats["rows"] += len(chunk)
+            stats["chunks"] += 1
+            if progress is not None:
+                progress(stats["rows"])
+    except Exception:
+        # A chunk failed before anything reached the targets, only the staging tables are left to drop
+        for sink in sinks:
+            sink.abort()
+        raise
+    for sink in sinks:
+        sink.close()
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,84 @@
+import hashlib
+import re
+import time
+
+import openai
+import streamlit as st
+
+import tracing
+
+CHAT_MODEL = "gpt-3.5-turbo"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+class OpenAIClient:
+    def __init__(self, model: str = CHAT_MODEL, embedding_model: str = EMBEDDING_MODEL):
+        openai.api_key = st.secrets.OPENAI_API_KEY
+        self.model = model
+        self.embedding_model = embedding_model
+
+    def stream(self, messages: list):
+        deltas = (delta.choices[0].delta.get("content", "") for delta in openai.ChatCompletion.create(model=self.model, messages=messages, stream=True))
+        yield from tracing.traced_stream("llm.completion", deltas, model=self.model)
+
+    def embed(self, text: str) -> list:
+        with tracing.span("llm.embed", model=self.embedding_model):
+            return openai.Embedding.create(model=self.embedding_model, input=text)["data"][0]["embedding"]
+
+
+# Canned answers for the fake client, matched against the latest user message
+FAKE_ANSWERS = [
+    (r"region", "ORDER_REGION_ADDR", "SUM(SALES_AMT)"),
+    (r"segment", "CUSTOMER_SEGMENT_CAT", "AVG(ORDER_ITEM_TOTAL_AMT)"),
+    (r"categor", "CATEGORY_NAME_ATTR", "SUM(SALES_AMT)"),
+    (r"product", "PRODUCT_NAME_ATTR", "SUM(SALES_AMT)"),
+    (r"deliver|ship", "DELIVERY_STATUS_CAT", "COUNT(*)"),
+]
+
+
+class FakeLLMClient:
+    # Deterministic, offline stand-in for OpenAIClient with configurable latency
+
+    def __init__(self, first_token_latency: float = 0.0, token_latency: float = 0.0, dimensions: int = 64):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def answer(self, messages: list) -> str:
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        if not question:
+            return "This table holds Big Supply Co. orders with sales, profit and delivery details.\n\n- What are the sales by region?\n- What is the average order by segment?\n- Which delivery status is most common?"
+        _, dimension, measure = next(
+            (answer for answer in FAKE_ANSWERS if re.search(answer[0], question, re.IGNORECASE)),
+            FAKE_ANSWERS[0],
+        )
+        return f"Here is the query:\n\n```sql\nSELECT {dimension}, {measure} AS TOTAL_VAL\nFROM <tableName>\nGROUP BY {dimension}\nORDER BY TOTAL_VAL DESC\nLIMIT 10\n```"
+
+    def stream(self, messages: list):
+        self.calls += 1
+        yield from tracing.traced_stream("llm.completion", self._tokens(messages), model="fake")
+
+    def _tokens(self, messages: list):
+        time.sleep(self.first_token_latency)
+        for token in re.split(r"(\s+)", self.answer(messages)):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield token
+
+    def embed(self, text: str) -> list:
+        # Bag of hashed words, so reworded questions with the same words land close together
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimensions] += 1.0
+        return vector
+
+
+@st.cache_resource
+def get_llm_client():
+    if st.secrets.get("LLM_CLIENT", "openai") == "fake":
+        return FakeLLMClient(
+            first_token_latency=float(st.secrets.get("FAKE_LLM_FIRST_TOKEN_LATENCY", 0.0)),
+            token_latency=float(st.secrets.get("FAKE_LLM_TOKEN_LATENCY", 0.0)),
+        )
+    return OpenAIClient()
@@ -0,0 +1,122 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+
+
+def normalize_question(question: str) -> str:
+    question = re.sub(r"\s+", " ", question.lower()).strip()
+    return question.strip(" ?.!")
+
+
+def prompt_fingerprint(prompt_messages: list) -> str:
+    # The system prompt embeds the table context, so cached answers are dropped when the schema changes.
+    # The earlier user turns sent with the question (and the summary of dropped ones) are part of it too:
+    # a follow-up like "and last year?" only replays an answer given after the same questions.
+    system, history = prompt_messages[0], prompt_messages[1:]
+    if history and history[-1]["role"] == "user":
+        history = history[:-1]
+    digest = hashlib.sha256(system["content"].encode("utf-8"))
+    for message in history:
+        if message["role"] != "assistant":
+            digest.update(f"\x00{message['role']}\x00{normalize_question(message['content'])}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def latest_question(messages: list) -> str:
+    # The welcome turn has no user message yet and is cached under the empty question
+    return next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+
+class CompletionCache:
+    # Exact tier: normalized question + prompt fingerprint (schema and earlier user turns).
+    # Optional semantic tier: cosine similarity of question embeddings within the same prompt fingerprint.
+
+    def __init__(self, embed=None, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def lookup(self, question: str, fingerprint: str):
+        # Returns the cached entry or None, and the question's embedding when the semantic tier computed one,
+        # so store() after a miss does not embed the question a second time
+        key = (fingerprint, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry, None
+
+        vector = None
+        if self.embed is not None and key[1]:
+            vector = self._unit(self.embed(key[1]))
+            entry = self._nearest(fingerprint, vector)
+            if entry is not None:
+                with self._lock:
+                    self.semantic_hits += 1
+                return entry, vector
+
+        with self._lock:
+            self.misses += 1
+        return None, vector
+
+    def store(self, question: str, fingerprint: str, response: str, sql: str = None, vector=None):
+        key = (fingerprint, normalize_question(question))
+        if vector is None and self.embed is not None and key[1]:
+            vector = self._unit(self.embed(key[1]))
+        with self._lock:
+            self._entries[key] = {"response": response, "sql": sql, "vector": vector}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _nearest(self, fingerprint: str, vector):
+        with self._lock:
+            candidates = [e for (fp, _), e in self._entries.items() if fp == fingerprint and e["vector"] is not None]
+        if not candidates:
+            return None
+        similarities = np.stack([e["vector"] for e in candidates]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return candidates[best]
+        return None
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+@st.cache_resource
+def get_completion_cache(_client) -> CompletionCache:
+    # Shared by every session, the semantic tier is opt-in because it costs an embedding call per question
+    semantic = bool(st.secrets.get("LLM_SEMANTIC_CACHE", False))
+    return CompletionCache(
+        embed=_client.embed if semantic else None,
+        similarity_threshold=float(st.secrets.get("LLM_SIMILARITY_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD)),
+        max_entries=int(st.secrets.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+    )
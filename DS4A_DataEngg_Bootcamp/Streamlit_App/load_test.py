@@ -0,0 +1,596 @@
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(APP_DIR)
+SCRIPT_PATH = os.path.join(APP_DIR, "Hello.py")
+DATA_DIR = os.path.join(REPO_DIR, "BigSupplyCoDataFiles")
+ATTRIBUTES_SEED = os.path.join(REPO_DIR, "BigSupplyCo_dbt", "seeds", "bigsupplyco_attributes.csv")
+CARD_FILE = os.path.join(REPO_DIR, "Project 2", "Data_Files", "sd254_cards_de.parquet")
+TRANSFORMATIONS_FILE = os.path.join(REPO_DIR, "Project 2", "Data_Files", "transformations.json")
+
+# The DuckDB file is named after the Snowflake database, so AIRBYTE_DATABASE.AIRBYTE_SCHEMA.ORDERS resolves unchanged
+WAREHOUSE_FILE = "AIRBYTE_DATABASE.duckdb"
+SCHEMA = "AIRBYTE_SCHEMA"
+
+# The dims the orders model joins, read from the files Airbyte synced and renamed like the staging models
+DIM_FILES = {
+    "customers": ("BigSupplyCo_Customers.csv", "Customer Id", {
+        "Customer Id": "CUSTOMER_ID", "Customer City": "CUSTOMER_CITY_ADDR", "Customer Country": "CUSTOMER_COUNTRY_ADDR",
+        "Customer Email": "CUSTOMER_EMAIL_ATTR", "Customer Fname": "CUSTOMER_FIRST_NAME_ATTR", "Customer Lname": "CUSTOMER_LAST_NAME_ATTR",
+        "Customer Password": "CUSTOMER_PASSWORD_STRID", "Customer Segment": "CUSTOMER_SEGMENT_CAT", "Customer State": "CUSTOMER_STATE_ADDR",
+        "Customer Street": "CUSTOMER_STREET_ADDR", "Customer Zipcode": "CUSTOMER_ZIPCODE_ADDR",
+    }),
+    "departments": ("BigSupplyCo_Departments.csv", "Department Id", {
+        "Department Id": "DEPARTMENT_ID", "Department Name": "DEPARTMENT_NAME_ATTR", "Latitude": "LATITUDE_VAL", "Longitude": "LONGITUDE_VAL",
+    }),
+    "products": ("BigSupplyCo_Products.csv", "Product Card Id", {
+        "Product Card Id": "PRODUCT_CARD_ID", "Product Category Id": "PRODUCT_CATEGORY_ID", "Product Description": "PRODUCT_DESCRIPTION_TXT",
+        "Product Image": "PRODUCT_IMAGE_URL_ATTR", "Product Name": "PRODUCT_NAME_ATTR", "Product Price": "PRODUCT_PRICE_AMT",
+        "Product Status": "IS_PRODUCT_AVAILABLE",
+    }),
+    "categories": ("BigSupplyCo_Categories.csv", "Category Id", {"Category Id": "CATEGORY_ID", "Category Name": "CATEGORY_NAME_ATTR"}),
+}
+
+# BigSupplyCo_Orders.csv is not in the repo, order lines are generated over these destinations instead
+DESTINATIONS = [
+    ("LATAM", "Central America", "Mexico", "Mexico City"),
+    ("LATAM", "South America", "Brazil", "Sao Paulo"),
+    ("LATAM", "Caribbean", "Dominican Republic", "Santo Domingo"),
+    ("Europe", "Western Europe", "France", "Paris"),
+    ("Europe", "Northern Europe", "United Kingdom", "London"),
+    ("Europe", "Southern Europe", "Italy", "Rome"),
+    ("Pacific Asia", "Southeast Asia", "Indonesia", "Jakarta"),
+    ("Pacific Asia", "Oceania", "Australia", "Sydney"),
+    ("USCA", "West of USA", "United States", "Los Angeles"),
+    ("USCA", "East of USA", "United States", "New York City"),
+    ("Africa", "West Africa", "Nigeria", "Lagos"),
+    ("Africa", "North Africa", "Egypt", "Cairo"),
+]
+DELIVERY_STATUSES = ["Advance shipping", "Late delivery", "Shipping on time", "Shipping canceled"]
+ORDER_STATUSES = ["COMPLETE", "PENDING", "CLOSED", "PENDING_PAYMENT", "CANCELED", "PROCESSING", "SUSPECTED_FRAUD", "ON_HOLD", "PAYMENT_REVIEW"]
+PAYMENT_TYPES = ["DEBIT", "TRANSFER", "PAYMENT", "CASH"]
+
+CHAT_QUESTIONS = [
+    "What are the total sales by region?",
+    "What is the average order amount by customer segment?",
+    "Which product categories sell the most?",
+    "Which products bring in the most sales?",
+    "How many orders are there per delivery status?",
+    "Which regions have the highest sales this year?",
+]
+
+# A one-candidate search, the page only needs a trained artifact to render
+FIXTURE_PARAM_GRID = {
+    'n_estimators': [50], 'max_depth': [10], 'max_features': ['sqrt'],
+    'min_samples_split': [2], 'min_samples_leaf': [1], 'bootstrap': [True],
+}
+
+
+def synthetic_order_lines(customers: pd.DataFrame, departments: pd.DataFrame, products: pd.DataFrame, rows: int) -> pd.DataFrame:
+    # fct_orders-shaped lines over the real customers, departments and products, a few items per order
+    rng = np.random.default_rng(1613)
+    order_ids = np.sort(rng.integers(1, max(2, rows // 3), rows))
+    product = products.iloc[rng.integers(0, len(products), rows)].reset_index(drop=True)
+    destination = pd.DataFrame(DESTINATIONS, columns=["MARKET_CAT", "ORDER_REGION_ADDR", "ORDER_COUNTRY_ADDR", "ORDER_CITY_ADDR"]).iloc[rng.integers(0, len(DESTINATIONS), rows)].reset_index(drop=True)
+    quantity = rng.integers(1, 6, rows)
+    sales = np.round(product["PRODUCT_PRICE_AMT"].to_numpy(dtype=np.float64) * quantity, 2)
+    discount_pct = np.round(rng.choice([0, 0.01, 0.05, 0.1, 0.15, 0.2, 0.25], rows), 2)
+    total = np.round(sales * (1 - discount_pct), 2)
+    scheduled = rng.choice([0, 1, 2, 4], rows)
+    real = np.clip(scheduled + rng.integers(-1, 4, rows), 0, None)
+    return pd.DataFrame({
+        "ORDER_ID": order_ids,
+        "ORDER_ITEM_ID": np.arange(1, rows + 1),
+        "ORDER_ITEM_CARDPROD_ID": product["PRODUCT_CARD_ID"],
+        "ORDER_CUSTOMER_ID": customers["CUSTOMER_ID"].to_numpy()[rng.integers(0, len(customers), rows)],
+        "ORDER_DEPARTMENT_ID": departments["DEPARTMENT_ID"].to_numpy()[rng.integers(0, len(departments), rows)],
+        **destination,
+        "ORDER_STATE_ADDR": destination["ORDER_CITY_ADDR"],
+        "ORDER_STATUS_CAT": rng.choice(ORDER_STATUSES, rows),
+        "ORDER_ZIPCODE_ADDR": None,
+        "ORDER_DT": pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365, rows), unit="D"),
+        "ORDER_ITEM_DISCOUNT_AMT": np.round(sales - total, 2),
+        "ORDER_ITEM_DISCOUNT_PCT": discount_pct,
+        "N_ORDER_ITEMS": quantity,
+        "SALES_AMT": sales,
+        "ORDER_ITEM_TOTAL_AMT": total,
+        "ORDER_PROFIT_AMT": np.round(total * rng.uniform(-0.3, 0.4, rows), 2),
+        "PAYMENT_TYPE_CAT": rng.choice(PAYMENT_TYPES, rows),
+        "N_DAYS_FOR_SHIPPING__REAL": real,
+        "N_DAYS_FOR_SHIPMENT__SCHEDULED": scheduled,
+        "DELIVERY_STATUS_CAT": np.where(real > scheduled, "Late delivery", rng.choice(DELIVERY_STATUSES, rows)),
+        "IS_LATE_DELIVERY_RISK": (real > scheduled).astype(int),
+    })
+
+
+def build_warehouse(directory: str, orders: int) -> str:
+    # ORDERS, the aggregate marts and BIGSUPPLYCO_ATTRIBUTES in a DuckDB file shaped like the Snowflake database
+    import duckdb
+
+    path = os.path.join(directory, WAREHOUSE_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+    dims = {}
+    for name, (file_name, key, columns) in DIM_FILES.items():
+        # The files repeat some keys (one department row per store), the dims keep one row per key
+        dims[name] = pd.read_csv(os.path.join(DATA_DIR, file_name)).drop_duplicates(key)[list(columns)].rename(columns=columns)
+    lines = synthetic_order_lines(dims["customers"], dims["departments"], dims["products"], orders)
+    # Same left joins as int_orders
+    orders_table = (
+        lines
+        .merge(dims["customers"], how="left", left_on="ORDER_CUSTOMER_ID", right_on="CUSTOMER_ID")
+        .merge(dims["departments"], how="left", left_on="ORDER_DEPARTMENT_ID", right_on="DEPARTMENT_ID")
+        .merge(dims["products"], how="left", left_on="ORDER_ITEM_CARDPROD_ID", right_on="PRODUCT_CARD_ID")
+        .merge(dims["categories"], how="left", left_on="PRODUCT_CATEGORY_ID", right_on="CATEGORY_ID")
+    )
+    attributes = pd.read_csv(ATTRIBUTES_SEED).rename(columns=str.upper)
+
+    conn = duckdb.connect(path)
+    try:
+        conn.execute(f"CREATE SCHEMA {SCHEMA}")
+        for table, df in (("ORDERS", orders_table), ("BIGSUPPLYCO_ATTRIBUTES", attributes)):
+            conn.register("fixture", df)
+            conn.execute(f"CREATE TABLE {SCHEMA}.{table} AS SELECT * FROM fixture")
+            conn.unregister("fixture")
+        # Same aggregates as the dbt marts in models/marts/aggregates
+        conn.execute(f"""
+            CREATE TABLE {SCHEMA}.AGG_CATEGORY AS
+            SELECT PRODUCT_CATEGORY_ID, CATEGORY_NAME_ATTR, SUM(SALES_AMT) AS TOTAL_SALES_AMT_PER_CATEGORY_VAL, COUNT(*) AS N_ORDERS_PER_CATEGORY_VAL
+            FROM {SCHEMA}.ORDERS GROUP BY PRODUCT_CATEGORY_ID, CATEGORY_NAME_ATTR
+        """)
+        conn.execute(f"""
+            CREATE TABLE {SCHEMA}.AGG_PRODUCT AS
+            SELECT PRODUCT_CARD_ID, PRODUCT_NAME_ATTR, VARIANCE(PRODUCT_PRICE_AMT) AS PRODUCT_PRICE_VARIANCE_VAL,
+                STDDEV(PRODUCT_PRICE_AMT) AS PRODUCT_PRICE_STDDEV_VAL, COUNT(*) AS N_ORDERS_PER_PRODUCT_VAL
+            FROM {SCHEMA}.ORDERS GROUP BY PRODUCT_CARD_ID, PRODUCT_NAME_ATTR
+        """)
+        conn.execute(f"""
+            CREATE TABLE {SCHEMA}.AGG_REGION AS
+            SELECT ORDER_REGION_ADDR, COUNT(*) AS N_ORDERS_PER_REGION_VAL, SUM(SALES_AMT) AS TOTAL_SALES_AMT_PER_REGION_VAL
+            FROM {SCHEMA}.ORDERS GROUP BY ORDER_REGION_ADDR
+        """)
+        conn.execute(f"""
+            CREATE TABLE {SCHEMA}.AGG_SEGMENT AS
+            SELECT CUSTOMER_SEGMENT_CAT, AVG(ORDER_ITEM_TOTAL_AMT) AS AVG_ORDER_AMT_PER_SEGMENT_VAL, COUNT(*) AS N_ORDERS_PER_SEGMENT_VAL
+            FROM {SCHEMA}.ORDERS GROUP BY CUSTOMER_SEGMENT_CAT
+        """)
+    finally:
+        conn.close()
+    return path
+
+
+def prepare_schema_context(warehouse: str) -> list:
+    # The chatbot reads its schema context from an artifact next to the app, introspected from Snowflake's
+    # per-database INFORMATION_SCHEMA when missing. DuckDB only has it unqualified, so the artifact is built here.
+    # Returns the files created, they are removed after the run so the app never sees the DuckDB types.
+    import duckdb
+    import prompts
+    import schema_context
+
+    aggregate_tables = list(prompts.AGGREGATE_TABLE_NAMES.values())
+    artifact = schema_context.load_artifact()
+    if schema_context.is_current(artifact, prompts.QUALIFIED_TABLE_NAME, prompts.METADATA_QUERY, schema_context.schema_hash(), aggregate_tables):
+        return []
+    conn = duckdb.connect(warehouse)
+    try:
+        run_query = lambda sql: conn.execute(sql.replace("AIRBYTE_DATABASE.INFORMATION_SCHEMA.", "information_schema.")).df().rename(columns=str.upper)
+        artifact = schema_context.build_artifact(prompts.QUALIFIED_TABLE_NAME, run_query, prompts.METADATA_QUERY, schema_context.schema_hash(), aggregate_tables)
+    finally:
+        conn.close()
+    schema_context.save_artifact(artifact)
+    return [schema_context.ARTIFACT_PATH]
+
+
+def prepare_fraud_page(directory: str, rows: int):
+    # The ML Fraud Detection page reads the EDA cube and the model artifact next to the app. Without them and
+    # without the transaction file both are built from synthetic transactions, like `python fraud_model.py --synthetic` would.
+    # Returns the file the scoring step uploads and the files created, which are removed after the run.
+    import fraud_eda
+    import fraud_model
+
+    created = []
+    source = None
+    if fraud_eda.cube_metadata() is None and fraud_model.data_fingerprint() is None:
+        source = fraud_model.prepare(fraud_model._synthetic_transactions(rows))
+        fraud_eda.save_cube(fraud_eda.build_cube(source), {
+            "version": fraud_eda.CUBE_VERSION,
+            "source_fingerprint": None,
+            "transactions": int(len(source)),
+            "fraudulent": int(source[fraud_model.TARGET_COLUMN].sum()),
+        })
+        created.append(fraud_eda.CUBE_PATH)
+    if fraud_model.load_artifact() is None:
+        if source is None:
+            source = fraud_model.load_transactions() if fraud_model.data_fingerprint() else fraud_model.prepare(fraud_model._synthetic_transactions(rows))
+        artifact = fraud_model.train(df=source, param_grid=FIXTURE_PARAM_GRID, search="grid")
+        artifact["synthetic"] = fraud_model.data_fingerprint() is None
+        fraud_model.save_artifact(artifact)
+        created.append(fraud_model.ARTIFACT_PATH)
+    # Raw transactions, like the files the page is meant to score
+    path = os.path.join(directory, "transactions_to_score.csv")
+    fraud_model._synthetic_transactions(5_000).drop(columns=[fraud_model.TARGET_COLUMN]).to_csv(path, index=False)
+    return path, created
+
+
+def write_secrets(directory: str, settings: dict):
+    # st.secrets reads .streamlit/secrets.toml from the working directory the workers are started in
+    os.makedirs(os.path.join(directory, ".streamlit"), exist_ok=True)
+    with open(os.path.join(directory, ".streamlit", "secrets.toml"), "w") as f:
+        for key, value in settings.items():
+            f.write(f"{key} = {json.dumps(value)}\n")
+
+
+class HeadlessSession:
+    # One browser tab without a browser: its own session state and uploads, every interaction reruns
+    # Hello.py in a new script thread with the widget values a frontend would send, like the server does
+
+    def __init__(self, script_cache, timeout: float):
+        from streamlit.runtime.memory_uploaded_file_manager import MemoryUploadedFileManager
+        from streamlit.runtime.state.session_state import SessionState
+
+        self.session_id = uuid.uuid4().hex
+        self.session_state = SessionState()
+        self.uploads = MemoryUploadedFileManager("/load_test/upload")
+        self.script_cache = script_cache
+        self.timeout = timeout
+        self.tree = None
+        # File uploads are resent on every rerun, like the frontend keeps sending the uploader's value
+        self.uploaded = {}
+        self.timings = []
+        self.errors = []
+        self.page = None
+
+    def rerun(self, extra_states: list = ()) -> float:
+        from streamlit.proto.WidgetStates_pb2 import WidgetStates
+        from streamlit.runtime.scriptrunner import RerunData, ScriptRunner, ScriptRunnerEvent
+        from streamlit.testing.element_tree import parse_tree_from_messages
+
+        states = self.tree.get_widget_states() if self.tree is not None else WidgetStates()
+        sent = {state.id for state in extra_states}
+        states.widgets.extend(extra_states)
+        states.widgets.extend(state for widget_id, state in self.uploaded.items() if widget_id not in sent)
+
+        messages = []
+        finished = threading.Event()
+
+        def on_event(sender, event, **kwargs):
+            if event == ScriptRunnerEvent.ENQUEUE_FORWARD_MSG:
+                msg = kwargs["forward_msg"]
+                # st.empty() and st.container() blocks carry no type, which the element tree cannot parse
+                if msg.HasField("delta") and msg.delta.HasField("add_block") and msg.delta.add_block.WhichOneof("type") is None:
+                    msg.delta.add_block.vertical.SetInParent()
+                messages.append(msg)
+            elif event in (ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS, ScriptRunnerEvent.SCRIPT_STOPPED_WITH_COMPILE_ERROR):
+                finished.set()
+
+        runner = ScriptRunner(
+            session_id=self.session_id,
+            main_script_path=SCRIPT_PATH,
+            session_state=self.session_state,
+            uploaded_file_mgr=self.uploads,
+            script_cache=self.script_cache,
+            initial_rerun_data=RerunData(widget_states=states),
+            user_info={"email": "load-test@localhost"},
+        )
+        runner.on_event.connect(on_event, weak=False)
+        started = time.perf_counter()
+        runner.start()
+        if not finished.wait(self.timeout):
+            runner.request_stop()
+            raise TimeoutError(f"Rerun of {self.page} did not finish in {self.timeout:g}s")
+        seconds = time.perf_counter() - started
+
+        self.tree = parse_tree_from_messages(messages)
+        self.tree.script_path = SCRIPT_PATH
+        self.tree._session_state = self.session_state
+        self.page = self.widget("selectbox", "Choose a page").value
+        self.timings.append((self.page, seconds))
+        self.errors.extend(f"{self.page}: {node.message.splitlines()[0] if node.message else 'exception'}" for node in self.tree if node.type == "exception")
+        return seconds
+
+    def widget(self, kind: str, label: str = None):
+        for node in self.tree:
+            if node.type != kind:
+                continue
+            # Widgets the element tree knows have a label, the others (file_uploader, chat_input) only their proto
+            node_label = node.label if hasattr(node, "label") else getattr(getattr(node.proto, kind), "label", None)
+            if label is None or node_label == label:
+                return node
+        raise LookupError(f"No {kind} labelled {label!r} on {self.page}")
+
+    def open(self):
+        return self.rerun()
+
+    def select(self, label: str, value):
+        self.widget("selectbox", label).select(value)
+        return self.rerun()
+
+    def choose(self, label: str, value):
+        self.widget("radio", label).set_value(value)
+        return self.rerun()
+
+    def check(self, label: str, value: bool):
+        self.widget("checkbox", label).check() if value else self.widget("checkbox", label).uncheck()
+        return self.rerun()
+
+    def click(self, label: str):
+        self.widget("button", label).click()
+        return self.rerun()
+
+    def chat(self, text: str):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=self.widget("chat_input").proto.chat_input.id)
+        state.string_trigger_value.data = text
+        return self.rerun([state])
+
+    def upload(self, label: str, path: str):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        from streamlit.runtime.uploaded_file_manager import UploadedFileRec
+
+        with open(path, "rb") as f:
+            data = f.read()
+        file_id = uuid.uuid4().hex
+        name = os.path.basename(path)
+        self.uploads.add_file(self.session_id, UploadedFileRec(file_id=file_id, name=name, type="application/octet-stream", data=data))
+        state = WidgetState(id=self.widget("file_uploader", label).proto.file_uploader.id)
+        state.file_uploader_state_value.uploaded_file_info.add(file_id=file_id, name=name, size=len(data))
+        # The file it replaces is deleted, as the frontend does when another file is dropped on the uploader
+        if state.id in self.uploaded:
+            for previous in self.uploaded[state.id].file_uploader_state_value.uploaded_file_info:
+                self.uploads.remove_file(self.session_id, previous.file_id)
+        self.uploaded[state.id] = state
+        return self.rerun([state])
+
+
+# Each scenario is one analyst on one page: it opens the page, then every step is one interaction.
+# The steps are generators so a session can stop after any number of reruns.
+
+def browse_visualizations(session: HeadlessSession, rng: random.Random, files: dict):
+    session.open()
+    yield
+    session.select("Choose a page", "Visualizations")
+    yield
+    while True:
+        label = rng.choice(["Select Region", "Select Category", "Select Customer Segment", "Use Filtered Data"])
+        if label == "Use Filtered Data":
+            session.check(label, not session.widget("checkbox", label).value)
+        else:
+            session.select(label, rng.choice(session.widget("selectbox", label).options))
+        yield
+
+
+def ask_chatbot(session: HeadlessSession, rng: random.Random, files: dict):
+    session.open()
+    yield
+    # Opening the page generates the welcome message
+    session.select("Choose a page", "Chatbot")
+    yield
+    while True:
+        session.chat(rng.choice(CHAT_QUESTIONS))
+        yield
+
+
+def ingest_card_file(session: HeadlessSession, rng: random.Random, files: dict):
+    session.open()
+    yield
+    session.choose("Select a Project", "Finance")
+    yield
+    session.upload("Choose a file", files["cards"])
+    yield
+    session.upload("Choose a JSON file", files["transformations"])
+    yield
+    session.click("Apply Transformations")
+    yield
+    while True:
+        step = rng.choice(["Prepare CSV", "Analyze Data Sample", "upload"])
+        if step == "upload":
+            session.upload("Choose a file", files["cards"])
+        else:
+            session.click(step)
+        yield
+
+
+def score_transactions(session: HeadlessSession, rng: random.Random, files: dict):
+    session.open()
+    yield
+    session.choose("Select a Project", "Finance")
+    yield
+    session.select("Choose a page", "ML Fraud Detection")
+    yield
+    while True:
+        session.upload("Transactions to score", files["transactions"])
+        yield
+
+
+SCENARIOS = {
+    "visualizations": browse_visualizations,
+    "chatbot": ask_chatbot,
+    "data_ingestor": ingest_card_file,
+    "data_science": score_transactions,
+}
+
+
+def percentile_ms(seconds: list, q: float) -> float:
+    return float(np.percentile(seconds, q)) * 1000 if seconds else 0.0
+
+
+class RssSampler:
+    # Peak resident memory while the sessions run. ru_maxrss would also count the warm-up, which
+    # touches every page once and peaks higher than a few sessions do.
+
+    def __init__(self, interval: float = 0.05):
+        import psutil
+
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = self.process.memory_info().rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def run_sessions(sessions: int, reruns: int, scenarios: list, files: dict, think: float, timeout: float) -> dict:
+    # Runs in a worker process per session count, so the peak RSS is that of this many sessions only
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    # The parts of the server the script runs use: the caches and the media files (charts, downloads).
+    # Set up like streamlit.testing does for its own script tests.
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/load_test/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    script_cache = ScriptCache()
+
+    # One session walks every page first so imports, st.cache_* and the query cache are warm, the
+    # measurement is the steady state and not the first visitor
+    for name in scenarios:
+        warmup = HeadlessSession(script_cache, timeout)
+        for _ in zip(range(reruns), SCENARIOS[name](warmup, random.Random(0), files)):
+            pass
+        if warmup.errors:
+            raise RuntimeError(f"The {name} page failed during warm-up: {warmup.errors[0]}")
+    # The warm-up's garbage is not the sessions' memory
+    gc.collect()
+
+    def session_loop(session: HeadlessSession, name: str, seed: int):
+        try:
+            rng = random.Random(seed)
+            for _ in zip(range(reruns), SCENARIOS[name](session, rng, files)):
+                if think:
+                    time.sleep(rng.uniform(0, 2 * think))
+        except Exception as e:
+            session.errors.append(f"{session.page}: {type(e).__name__}: {e}")
+
+    # Sessions are spread over the scenarios round robin, all of them start at once
+    started_sessions = [(HeadlessSession(script_cache, timeout), scenarios[i % len(scenarios)]) for i in range(sessions)]
+    threads = [threading.Thread(target=session_loop, args=(session, name, i)) for i, (session, name) in enumerate(started_sessions)]
+    # The process once warm is the baseline, the growth above it is what the concurrent sessions cost
+    with RssSampler() as rss:
+        baseline = rss.peak
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+
+    timings = [timing for session, _ in started_sessions for timing in session.timings]
+    errors = [error for session, _ in started_sessions for error in session.errors]
+    seconds = [s for _, s in timings]
+    pages = {}
+    for page, s in timings:
+        pages.setdefault(page, []).append(s)
+    return {
+        "sessions": sessions,
+        "reruns": len(seconds),
+        "errors": len(errors),
+        "first_errors": sorted(set(errors))[:5],
+        "seconds": wall_seconds,
+        "reruns_per_second": len(seconds) / wall_seconds if wall_seconds else 0.0,
+        "p50_ms": percentile_ms(seconds, 50),
+        "p99_ms": percentile_ms(seconds, 99),
+        "peak_rss_mb": rss.peak / 2**20,
+        "rss_per_session_mb": (rss.peak - baseline) / 2**20 / sessions,
+        "pages": {page: {"reruns": len(s), "p50_ms": percentile_ms(s, 50), "p99_ms": percentile_ms(s, 99)} for page, s in pages.items()},
+    }
+
+
+# do `python load_test.py --sessions 1 5 10 25` to see how the app holds up as analysts are added.
+# Everything runs offline: a DuckDB copy of the warehouse, the fake LLM client and synthetic fraud data.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive the app's pages with concurrent headless sessions and report rerun latency, throughput and memory")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25], help="concurrent session counts, each run in a fresh process")
+    parser.add_argument("--reruns", type=int, default=20, help="interactions per session, opening the page included")
+    parser.add_argument("--pages", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS), help="page functions the sessions are spread over")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds a session waits between interactions, 0 for back-to-back reruns")
+    parser.add_argument("--orders", type=int, default=200_000, help="synthetic order lines in the DuckDB warehouse")
+    parser.add_argument("--pool-size", type=int, default=4, help="DATABASE_POOL_SIZE of the app")
+    parser.add_argument("--first-token-latency", type=float, default=0.5, help="seconds before the fake LLM's first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds between the fake LLM's tokens")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds a single rerun may take")
+    parser.add_argument("--workdir", default="", help="where the warehouse, secrets and traces go, a temp directory when empty")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(os.path.join(os.getcwd(), "files.json")) as f:
+            files = json.load(f)
+        result = run_sessions(args.sessions[0], args.reruns, args.pages, files, args.think, args.timeout)
+        print(json.dumps(result))
+        sys.exit(0)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bigsupplyco_load_test_")
+    os.makedirs(workdir, exist_ok=True)
+    print(f"Building the DuckDB warehouse with {args.orders:,} order lines in {workdir}")
+    warehouse = build_warehouse(workdir, args.orders)
+    # Artifacts the pages read from next to the app, only the ones created here are removed afterwards
+    created = []
+    try:
+        created += prepare_schema_context(warehouse)
+        files = {"cards": CARD_FILE, "transformations": TRANSFORMATIONS_FILE}
+        if "data_science" in args.pages:
+            files["transactions"], fraud_files = prepare_fraud_page(workdir, rows=300_000)
+            created += fraud_files
+        with open(os.path.join(workdir, "files.json"), "w") as f:
+            json.dump(files, f)
+        write_secrets(workdir, {
+            "DATABASE_URL": f"duckdb:///{warehouse}",
+            "DATABASE_POOL_SIZE": args.pool_size,
+            "LLM_CLIENT": "fake",
+            "FAKE_LLM_FIRST_TOKEN_LATENCY": args.first_token_latency,
+            "FAKE_LLM_TOKEN_LATENCY": args.token_latency,
+            "OPENAI_API_KEY": "not-used",
+            # build_warehouse() creates the AGG_* marts, so the pages read them like a synced warehouse would
+            "USE_AGGREGATE_MARTS": True,
+        })
+        # Spans of the test runs stay out of the app's own trace files
+        env = {**os.environ, "TRACE_DIR": os.path.join(workdir, "traces"), "PYTHONPATH": os.pathsep.join([APP_DIR, os.environ.get("PYTHONPATH", "")])}
+
+        print(f"{'sessions':>8}{'reruns':>8}{'errors':>8}{'reruns/s':>10}{'p50':>10}{'p99':>10}{'peak RSS':>11}{'per session':>13}")
+        for sessions in args.sessions:
+            command = [sys.executable, os.path.abspath(__file__), "--worker", "--sessions", str(sessions), "--reruns", str(args.reruns),
+                       "--think", str(args.think), "--timeout", str(args.timeout), "--pages", *args.pages]
+            completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(f"The run with {sessions} sessions failed:\n{completed.stderr[-3000:]}")
+            r = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{r['sessions']:>8}{r['reruns']:>8}{r['errors']:>8}{r['reruns_per_second']:>10.1f}{r['p50_ms']:>8.0f}ms{r['p99_ms']:>8.0f}ms"
+                  f"{r['peak_rss_mb']:>9.0f}MB{r['rss_per_session_mb']:>11.1f}MB")
+            for page, stats in sorted(r["pages"].items()):
+                print(f"    {page:<28}{stats['reruns']:>6} reruns, p50 {stats['p50_ms']:,.0f}ms, p99 {stats['p99_ms']:,.0f}ms")
+            for error in r["first_errors"]:
+                print(f"    error: {error}")
+    finally:
+        for path in created:
+            os.remove(path)
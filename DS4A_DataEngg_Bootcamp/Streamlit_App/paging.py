@@ -0,0 +1,137 @@
+import re
+
+import streamlit as st
+
+import queries
+import query_cache
+
+PAGE_SIZE = 100
+# Hard cap on how far a user or LLM query can be paged, no matter what LIMIT it asks for
+MAX_ROWS = 10000
+
+
+# String literals, quoted identifiers and comments, whose text never decides how a query is paged
+LITERAL_OR_COMMENT_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+TRAILING_LIMIT_PATTERN = re.compile(r"\blimit\s+(\d+)(?:\s+offset\s+(\d+))?\s*$", re.IGNORECASE)
+
+
+def strip_sql(sql: str) -> str:
+    return sql.strip().rstrip(";").strip()
+
+
+def _masked(sql: str, nested: bool = True) -> str:
+    # Same length as sql with literals and comments blanked, and with nested=True everything inside
+    # parentheses too, so a keyword found in it belongs to the outer query
+    masked = LITERAL_OR_COMMENT_PATTERN.sub(lambda m: " " * len(m.group(0)), sql)
+    if not nested:
+        return masked
+    chars = []
+    depth = 0
+    for ch in masked:
+        if ch == "(":
+            depth += 1
+        chars.append(ch if depth == 0 else " ")
+        if ch == ")":
+            depth = max(depth - 1, 0)
+    return "".join(chars)
+
+
+def returns_rows(sql: str) -> bool:
+    # SHOW, DESCRIBE and the like cannot be wrapped in a subquery, they are run as typed
+    return re.match(r"[\s(]*(select|with|values|table)\b", _masked(sql, nested=False), re.IGNORECASE) is not None
+
+
+def has_order_by(sql: str) -> bool:
+    return re.search(r"\border\s+by\b", _masked(strip_sql(sql)), re.IGNORECASE) is not None
+
+
+def _page_plan(sql: str, max_rows: int, order_by: str = None):
+    # How the query can be paged, as (mode, body, row cap, offset of its first row):
+    # "order_by": wrapped with the given ORDER BY on the outer query,
+    # "ordered": LIMIT/OFFSET appended to the query's own trailing ORDER BY (replacing its LIMIT),
+    # "single": no order to page over, fetched once up to max_rows,
+    # "as_is": not a plain query or limited in a way only it understands, run unchanged.
+    # A subquery's ORDER BY is not guaranteed to survive an outer LIMIT, so queries are never wrapped
+    # and paged on it.
+    sql = strip_sql(sql)
+    if not returns_rows(sql):
+        return "as_is", sql, max_rows, 0
+    if order_by:
+        return "order_by", sql, max_rows, 0
+    outer = _masked(sql)
+    orders = list(re.finditer(r"\border\s+by\b", outer, re.IGNORECASE))
+    if not orders:
+        return "single", sql, max_rows, 0
+    tail_start = orders[-1].end()
+    limit = TRAILING_LIMIT_PATTERN.search(outer, tail_start)
+    if limit is not None:
+        return "ordered", sql[:limit.start()].rstrip(), min(int(limit.group(1)), max_rows), int(limit.group(2) or 0)
+    if re.search(r"\b(limit|offset|fetch)\b", outer[tail_start:], re.IGNORECASE):
+        return "as_is", sql, max_rows, 0
+    return "ordered", sql, max_rows, 0
+
+
+def is_pageable(sql: str, order_by: str = None) -> bool:
+    return _page_plan(sql, MAX_ROWS, order_by)[0] in ("order_by", "ordered")
+
+
+def page_sql(sql: str, page: int = 0, page_size: int = PAGE_SIZE, max_rows: int = MAX_ROWS, order_by: str = None) -> str:
+    # One extra row is fetched when a next page is allowed, to know whether there is one.
+    # The closing parenthesis and the LIMIT go on their own line in case the query ends with a -- comment.
+    mode, body, cap, first = _page_plan(sql, max_rows, order_by)
+    if mode == "as_is":
+        return body
+    if mode == "single":
+        return f"""SELECT * FROM (
+{body}
+) AS PAGED_RESULT
+LIMIT {cap}"""
+    offset = page * page_size
+    limit = max(min(page_size, cap - offset), 0) + (1 if offset + page_size < cap else 0)
+    if mode == "ordered":
+        return f"""{body}
+LIMIT {limit} OFFSET {first + offset}"""
+    return f"""SELECT * FROM (
+{body}
+) AS PAGED_RESULT
+ORDER BY {order_by}
+LIMIT {limit} OFFSET {offset}"""
+
+
+def _set_page(key: str, page: int):
+    st.session_state[f"{key}_page"] = page
+
+
+def paged_dataframe(conn, sql: str, key: str, table_name: str = None, page_size: int = PAGE_SIZE, order_by: str = None):
+    # Renders one page of the query with Previous / Next buttons and returns that page.
+    # Only page_size rows ever come back from the warehouse, each page goes through the query cache.
+    # Queries typed by a user or written by the LLM are only paged over their own ORDER BY,
+    # without one they are fetched once up to MAX_ROWS.
+    if table_name:
+        sql = query_cache.resolve_table(sql, table_name)
+    if st.session_state.get(f"{key}_sql") != sql:
+        st.session_state[f"{key}_sql"] = sql
+        _set_page(key, 0)
+
+    if not is_pageable(sql, order_by):
+        results = queries.run_cached_query(conn, page_sql(sql, max_rows=MAX_ROWS))
+        st.dataframe(results)
+        if returns_rows(sql):
+            st.caption(f"{len(results):,} rows (capped at {MAX_ROWS:,}), add an ORDER BY to the query to page through them")
+        return results
+
+    page = st.session_state.get(f"{key}_page", 0)
+    results = queries.run_cached_query(conn, page_sql(sql, page, page_size, order_by=order_by))
+    has_next = len(results) > page_size
+    results = results.head(page_size)
+
+    st.dataframe(results)
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        st.button("Previous", key=f"{key}_previous", disabled=page == 0, on_click=_set_page, args=(key, page - 1))
+    with col2:
+        st.button("Next", key=f"{key}_next", disabled=not has_next, on_click=_set_page, args=(key, page + 1))
+    with col3:
+        first_row = page * page_size + 1 if len(results) else 0
+        st.caption(f"Rows {first_row}-{page * page_size + len(results)} (capped at {MAX_ROWS:,})")
+    return results
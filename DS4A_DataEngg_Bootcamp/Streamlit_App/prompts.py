@@ -1,6 +1,25 @@
 import streamlit as st
 
+import db
+import query_cache
+import schema_context
+
 QUALIFIED_TABLE_NAME = "AIRBYTE_DATABASE.AIRBYTE_SCHEMA.ORDERS"
+# Small marts built by dbt next to ORDERS, one row per category / segment / region / product
+AGGREGATE_TABLE_NAMES = {
+    "category": "AIRBYTE_DATABASE.AIRBYTE_SCHEMA.AGG_CATEGORY",
+    "segment": "AIRBYTE_DATABASE.AIRBYTE_SCHEMA.AGG_SEGMENT",
+    "region": "AIRBYTE_DATABASE.AIRBYTE_SCHEMA.AGG_REGION",
+    "product": "AIRBYTE_DATABASE.AIRBYTE_SCHEMA.AGG_PRODUCT",
+}
+
+
+def aggregate_table_names() -> dict:
+    # dbt builds the marts next to ORDERS, but they only reach Snowflake once they are added to the Airbyte sync.
+    # Until USE_AGGREGATE_MARTS is set in the secrets, the charts aggregate ORDERS and the chatbot is not told about them.
+    return AGGREGATE_TABLE_NAMES if st.secrets.get("USE_AGGREGATE_MARTS", False) else {}
+
+
 METADATA_QUERY = "SELECT VARIABLE_NAME, DEFINITION FROM AIRBYTE_DATABASE.AIRBYTE_SCHEMA.BIGSUPPLYCO_ATTRIBUTES;"
 TABLE_DESCRIPTION = """
 This table consists of information about orders, products, customers, departments, and product categories.
@@ -29,7 +48,7 @@ Here are 7 critical rules for the interaction you must abide:
 2. If I don't tell you to find a limited set of results in the sql query or question, you MUST limit the number of responses to 10.
 3. Text / string where clauses must be fuzzy match e.g ilike %keyword%
 4. Make sure to generate a single Snowflake SQL code snippet, not multiple. 
-5. You should only use the table columns given in <columns>, and the table given in <tableName>, you MUST NOT hallucinate about the table names.
+5. You should only use the table columns given in <columns>, and the table given in <tableName>, or the aggregate tables and columns given in <aggregateTables>, you MUST NOT hallucinate about the table names.
 6. DO NOT put numerical at the very front of SQL variable.
 7. The queries you provide will NOT include any DML operations such as DELETE, UPDATE, or INSERT.
 </rules>
@@ -47,21 +66,16 @@ Then provide 3 example questions using bullet points.
 """
 
 @st.cache_data(show_spinner=False)
-def get_table_context(table_name: str, table_description: str, metadata_query: str = None):
+def get_table_context(table_name: str, table_description: str, metadata_query: str = None, aggregate_tables: tuple = ()):
     table = table_name.split(".")
-    # conn = st.experimental_connection("postgresql", type="sql")
-    conn = st.experimental_connection("snowpark")
-    columns = conn.query(f"""
-        SELECT COLUMN_NAME, DATA_TYPE FROM {table[0].upper()}.INFORMATION_SCHEMA.COLUMNS
-        WHERE TABLE_SCHEMA = '{table[1].upper()}' AND TABLE_NAME = '{table[2].upper()}'
-        """,
-    )
-    columns = "\n".join(
-        [
-            f"- **{columns['COLUMN_NAME'][i]}**: {columns['DATA_TYPE'][i]}"
-            for i in range(len(columns["COLUMN_NAME"]))
-        ]
-    )
+
+    def run_query(sql):
+        return query_cache.get_query_cache().get_or_run(sql, db.get_database().query)
+
+    # The columns and metadata come from a stored artifact, the warehouse is only connected to
+    # when the dbt schema has changed since it was built
+    artifact = schema_context.load_or_build(table_name, run_query, metadata_query, aggregate_tables=list(aggregate_tables))
+    columns = "\n".join(f"- **{name}**: {data_type}" for name, data_type in artifact["columns"])
     context = f"""
 Here is the table name <tableName> {'.'.join(table)} </tableName>
 
@@ -73,14 +87,20 @@ Here are the columns of the {'.'.join(table)}
     
 But please keep in mind, there may be more variable_names in the metadata table than the table name.
     """
-    if metadata_query:
-        metadata = conn.query(metadata_query)
-        metadata = "\n".join(
-            [
-                f"- **{metadata['VARIABLE_NAME'][i]}**: {metadata['DEFINITION'][i]}"
-                for i in range(len(metadata["VARIABLE_NAME"]))
-            ]
+    if artifact["aggregates"]:
+        aggregates = "\n\n".join(
+            f"<aggregateTable> {name} </aggregateTable>\n" + "\n".join(f"- **{column}**: {data_type}" for column, data_type in aggregate_columns)
+            for name, aggregate_columns in artifact["aggregates"].items()
         )
+        context = context + f"""
+
+Totals per category, customer segment, region and product are precomputed in these much smaller tables,
+query them instead of aggregating {'.'.join(table)} when a question only needs those totals:
+
+<aggregateTables>\n\n{aggregates}\n\n</aggregateTables>
+    """
+    if metadata_query:
+        metadata = "\n".join(f"- **{name}**: {definition}" for name, definition in artifact["metadata"])
         context = context + f"\n\nAvailable variables by variable_name:\n\n{metadata}"
     return context
 
@@ -88,7 +108,8 @@ def get_system_prompt():
     table_context = get_table_context(
         table_name=QUALIFIED_TABLE_NAME,
         table_description=TABLE_DESCRIPTION,
-        metadata_query=METADATA_QUERY
+        metadata_query=METADATA_QUERY,
+        aggregate_tables=tuple(aggregate_table_names().values()),
     )
     return GEN_SQL.format(context=table_context)
 
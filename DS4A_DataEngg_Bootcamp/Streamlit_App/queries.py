@@ -0,0 +1,123 @@
+import sqlite3
+
+import pandas as pd
+from streamlit.connections import ExperimentalBaseConnection
+
+import db
+import query_cache
+import tracing
+from prompts import QUALIFIED_TABLE_NAME
+
+# Columns the visualizations() sidebar filters on, keyed by the label shown in the app
+FILTER_COLUMNS = {
+    "Region": "ORDER_REGION_ADDR",
+    "Category": "CATEGORY_NAME_ATTR",
+    "Customer Segment": "CUSTOMER_SEGMENT_CAT",
+}
+
+# One row per order line in ORDERS (the dbt model's unique_key), pages of the filtered grid are ordered by it
+ORDER_KEY_COLUMNS = ("ORDER_ID", "ORDER_ITEM_ID")
+
+# Each chart is aggregated in the warehouse so only the small result set comes back.
+# Without filters a precomputed dbt mart is read instead when one is passed as aggregate_table.
+# The SQL is kept to plain ANSI so the same builders run on Snowflake, DuckDB and SQLite.
+
+
+def quote_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def where_clause(filters: dict = None) -> str:
+    if not filters:
+        return ""
+    conditions = [
+        f"{column} IS NULL" if value is None else f"{column} = {quote_literal(value)}"
+        for column, value in filters.items()
+    ]
+    return "\nWHERE " + "\n  AND ".join(conditions)
+
+
+def filter_options_sql(column: str, table: str = QUALIFIED_TABLE_NAME) -> str:
+    return f"""
+SELECT DISTINCT {column} AS {column}
+FROM {table}
+WHERE {column} IS NOT NULL
+ORDER BY {column}
+"""
+
+
+def filtered_orders_sql(filters: dict = None, table: str = QUALIFIED_TABLE_NAME) -> str:
+    return f"""
+SELECT *
+FROM {table}{where_clause(filters)}
+"""
+
+
+def region_sales_sql(filters: dict = None, table: str = QUALIFIED_TABLE_NAME, aggregate_table: str = None) -> str:
+    if not filters and aggregate_table:
+        return f"""
+SELECT ORDER_REGION_ADDR AS ORDER_REGION_ADDR, TOTAL_SALES_AMT_PER_REGION_VAL AS SALES_AMT
+FROM {aggregate_table}
+ORDER BY ORDER_REGION_ADDR
+"""
+    return f"""
+SELECT ORDER_REGION_ADDR AS ORDER_REGION_ADDR, SUM(SALES_AMT) AS SALES_AMT
+FROM {table}{where_clause(filters)}
+GROUP BY ORDER_REGION_ADDR
+ORDER BY ORDER_REGION_ADDR
+"""
+
+
+def sales_profit_sql(filters: dict = None, table: str = QUALIFIED_TABLE_NAME) -> str:
+    return f"""
+SELECT ORDER_DT AS ORDER_DT, SUM(SALES_AMT) AS SALES_AMT, SUM(ORDER_PROFIT_AMT) AS ORDER_PROFIT_AMT
+FROM {table}{where_clause(filters)}
+GROUP BY ORDER_DT
+ORDER BY ORDER_DT
+"""
+
+
+def delivery_status_sql(filters: dict = None, table: str = QUALIFIED_TABLE_NAME) -> str:
+    return f"""
+SELECT DELIVERY_STATUS_CAT AS DELIVERY_STATUS_CAT, COUNT(*) AS N_ORDERS
+FROM {table}{where_clause(filters)}
+GROUP BY DELIVERY_STATUS_CAT
+ORDER BY N_ORDERS DESC
+"""
+
+
+def run_query(conn, sql: str) -> pd.DataFrame:
+    # Works with the pooled db.Database, the Streamlit snowpark connection and a local sqlite3 or duckdb stand-in
+    if isinstance(conn, db.Database):
+        # Traced by the database itself, with its pool wait and chunk counts
+        return conn.query(sql)
+    with tracing.span("db.query", sql=sql.strip()[:200]) as query_span:
+        if isinstance(conn, sqlite3.Connection):
+            result = pd.read_sql_query(sql, conn)
+        elif isinstance(conn, ExperimentalBaseConnection):
+            # ttl=0 skips Streamlit's own per-connection cache, query_cache is the single caching policy
+            result = conn.query(sql, ttl=0)
+        else:
+            result = conn.query(sql)
+            if not isinstance(result, pd.DataFrame):
+                result = result.df()
+        query_span.set(rows=len(result), bytes=tracing.frame_bytes(result))
+        return result
+
+
+def run_cached_query(conn, sql: str, table_name: str = None) -> pd.DataFrame:
+    # Goes through the shared query cache, pass table_name to resolve `table` / <tableName> placeholders
+    return query_cache.get_query_cache().get_or_run(sql, lambda resolved: run_query(conn, resolved), table_name=table_name)
+
+
+def filter_options(conn, table: str = QUALIFIED_TABLE_NAME) -> dict:
+    return {
+        label: run_cached_query(conn, filter_options_sql(column, table))[column].tolist()
+        for label, column in FILTER_COLUMNS.items()
+    }
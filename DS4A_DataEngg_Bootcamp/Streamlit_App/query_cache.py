@@ -0,0 +1,170 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Quoted string literals and quoted identifiers are kept as-is, everything else is case/whitespace folded
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+TABLE_REFERENCE_PATTERN = re.compile(r"\b(?:from|join|into|update|table)\s+([\w.\"$]+)", re.IGNORECASE)
+
+
+def resolve_table(sql: str, table_name: str) -> str:
+    # The QIY box lets users type `table` and the chatbot answers with <tableName>.
+    # Quoted spans are left alone, ilike '%table%' is a product name filter and not the table.
+    parts = []
+    last = 0
+    for match in QUOTED_PATTERN.finditer(sql):
+        parts.append(re.sub(r"\btable\b", table_name, sql[last:match.start()].replace("<tableName>", table_name)))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(re.sub(r"\btable\b", table_name, sql[last:].replace("<tableName>", table_name)))
+    return "".join(parts)
+
+
+def normalize_sql(sql: str) -> str:
+    parts = []
+    last = 0
+    for match in QUOTED_PATTERN.finditer(sql):
+        parts.append(re.sub(r"\s+", " ", sql[last:match.start()]).lower())
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(re.sub(r"\s+", " ", sql[last:]).lower())
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def referenced_tables(sql: str) -> set:
+    # Only the last part of a qualified name is kept so that AIRBYTE_DATABASE.FINANCE.CARDS and CARDS match
+    return {name.replace('"', "").split(".")[-1].upper() for name in TABLE_REFERENCE_PATTERN.findall(sql)}
+
+
+def handout(result):
+    # Every session gets its own frame over the cached columns, so adding, renaming or dropping
+    # columns in a page does not change the entry other sessions read. Cells must not be assigned in place.
+    return result.copy(deep=False) if isinstance(result, pd.DataFrame) else result
+
+
+def result_size(result) -> int:
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    return sys.getsizeof(result)
+
+
+class QueryCache:
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        # Bumped by invalidate(), a query that started before it does not store its result afterwards
+        self._generation = 0
+
+    def get_or_run(self, sql: str, run, table_name: str = None):
+        if table_name:
+            sql = resolve_table(sql, table_name)
+        key = normalize_sql(sql)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry["seconds"]
+                return handout(entry["result"])
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            generation = self._generation
+
+        # The warehouse call happens outside the lock so other sessions are not blocked on it
+        started = time.monotonic()
+        result = run(sql)
+        seconds = time.monotonic() - started
+        self._store(key, sql, result, seconds, generation)
+        return handout(result)
+
+    def _store(self, key, sql, result, seconds, generation):
+        size = result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                # A write was invalidated while the query ran, its result may predate that write
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                "result": result,
+                "bytes": size,
+                "seconds": seconds,
+                "tables": referenced_tables(sql),
+                "expires_at": time.monotonic() + self.ttl,
+            }
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["bytes"]
+
+    def invalidate(self, table_name: str = None):
+        # Called after data_ingestor() writes so no stale results are served for that table
+        with self._lock:
+            self._generation += 1
+            if table_name is None:
+                keys = list(self._entries)
+            else:
+                table = table_name.replace('"', "").split(".")[-1].upper()
+                keys = [key for key, entry in self._entries.items() if table in entry["tables"]]
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+@st.cache_resource
+def get_query_cache() -> QueryCache:
+    # One cache per Streamlit process, shared by every session and every conn.query call site
+    return QueryCache(
+        ttl=float(st.secrets.get("QUERY_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        max_entries=int(st.secrets.get("QUERY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        max_bytes=int(st.secrets.get("QUERY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    )
+
+
+def render_cache_stats():
+    stats = get_query_cache().stats()
+    st.sidebar.caption(
+        f"Query cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%}), {stats['entries']} entries, "
+        f"{stats['bytes'] / 1024 / 1024:.1f} MB, ~{stats['saved_seconds']:.1f}s of warehouse time saved"
+    )
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+DEFAULT_BUDGET_BYTES = 32 * 1024 * 1024
+SPILL_ROOT = os.path.join(tempfile.gettempdir(), "bigsupplyco_results")
+# How many of the most recent chat results are loaded on every rerun, older ones load when expanded
+RENDERED_RESULTS = 3
+
+
+class ResultStore:
+    # Query results spilled to compressed files on local disk, so st.session_state only holds ids.
+    # When the budget is exceeded the oldest results are deleted first.
+
+    def __init__(self, directory: str, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self._files = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Streamlit has no session-end hook, the spill directory goes away with the store
+        self._finalizer = weakref.finalize(self, shutil.rmtree, directory, True)
+
+    def put(self, df: pd.DataFrame) -> str:
+        result_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, result_id)
+        try:
+            df.to_parquet(path + ".parquet", compression="zstd", index=False)
+            path += ".parquet"
+        except (ValueError, TypeError):
+            # Duplicate or non-string column names cannot be written to parquet
+            df.to_pickle(path + ".pkl.gz", compression="gzip")
+            path += ".pkl.gz"
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._files[result_id] = (path, size)
+            self._bytes += size
+            while self._bytes > self.budget_bytes and len(self._files) > 1:
+                self._evict(next(iter(self._files)))
+        return result_id
+
+    def get(self, result_id: str):
+        with self._lock:
+            entry = self._files.get(result_id)
+        if entry is None:
+            return None
+        path, _ = entry
+        # Read outside the lock so a slow read does not hold up put(), a result evicted
+        # in the meantime is reported like one evicted before the call
+        try:
+            if path.endswith(".parquet"):
+                return pd.read_parquet(path)
+            return pd.read_pickle(path, compression="gzip")
+        except FileNotFoundError:
+            return None
+
+    def _evict(self, result_id: str):
+        path, size = self._files.pop(result_id)
+        self._bytes -= size
+        if os.path.exists(path):
+            os.remove(path)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            for result_id in list(self._files):
+                self._evict(result_id)
+
+
+def get_result_store() -> ResultStore:
+    # One store per browser session
+    if "result_store" not in st.session_state:
+        st.session_state.result_store = ResultStore(
+            os.path.join(SPILL_ROOT, uuid.uuid4().hex),
+            budget_bytes=int(st.secrets.get("RESULT_STORE_BUDGET_BYTES", DEFAULT_BUDGET_BYTES)),
+        )
+    return st.session_state.result_store
@@ -0,0 +1,122 @@
+import re
+import time
+
+import plotly.graph_objects as go
+import streamlit as st
+
+import chat_history
+import db
+import llm
+import llm_cache
+import paging
+import queries
+import result_store
+from prompts import get_system_prompt, QUALIFIED_TABLE_NAME
+
+
+def chatbot():
+    st.title('Big Supply Co. - Retail Analysis')
+    conn = db.get_database()
+
+    # # Initialize the chat messages history
+    if "messages" not in st.session_state:
+        # system prompt includes table information, rules, and prompts the LLM to produce
+        # a welcome message to the user.
+        st.session_state.messages = [{"role": "system", "content": get_system_prompt()}]
+
+    # Prompt for user input and save
+    if prompt := st.chat_input():
+        st.session_state.messages.append({"role": "user", "content": prompt})
+
+    # Results live in the per-session spill store, the history only keeps their ids.
+    # Only the most recent ones are loaded on every rerun, older ones are loaded when asked for.
+    store = result_store.get_result_store()
+    with_results = [i for i, m in enumerate(st.session_state.messages) if "result_id" in m]
+    rendered = set(with_results[-result_store.RENDERED_RESULTS:])
+
+    # display the existing chat messages
+    for i, message in enumerate(st.session_state.messages):
+        if message["role"] == "system":
+            continue
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+            if message.get("cached"):
+                # Nothing was sent to the model, the prompt stats would describe a request that never happened
+                st.caption(f"Answered from the cache, {message['latency_seconds']:.2f}s")
+            elif "prompt_tokens" in message:
+                st.caption(
+                    f"{message['prompt_tokens']} prompt tokens, {message['kept_turns']} turns sent, "
+                    f"{message['dropped_turns']} summarized, {message['latency_seconds']:.2f}s"
+                )
+            if "results" in message:
+                st.write(message["results"])
+            if "result_id" in message and (i in rendered or st.checkbox("Show result", key=f"chat_show_{i}")):
+                results = store.get(message["result_id"])
+                if results is None:
+                    st.caption("This result was evicted to save memory, browse the rows again below.")
+                else:
+                    st.dataframe(results)
+            # The full result is paged from the warehouse on demand
+            if "sql" in message and st.checkbox("Browse all rows", key=f"chat_browse_{i}"):
+                paging.paged_dataframe(conn, message["sql"], key=f"chat_{i}")
+
+    # If last message is not from assistant, we need to generate a new response
+    if st.session_state.messages[-1]["role"] != "assistant":
+        with st.chat_message("assistant"):
+            response = ""
+            resp_container = st.empty()
+            # Repeated questions against the same schema are replayed from the completion cache
+            client = llm.get_llm_client()
+            completions = llm_cache.get_completion_cache(client)
+            question = llm_cache.latest_question(st.session_state.messages)
+            # Only the system prompt and a token-budgeted window of recent turns are sent
+            prompt_messages, prompt_stats = chat_history.build_prompt(st.session_state.messages, chat_history.get_prompt_token_budget())
+            # Keyed on what is sent besides the question, so a follow-up is not answered from another conversation
+            fingerprint = llm_cache.prompt_fingerprint(prompt_messages)
+            started = time.perf_counter()
+            cached, question_vector = completions.lookup(question, fingerprint)
+            if cached is not None:
+                response = cached["response"]
+                resp_container.markdown(response)
+            else:
+                for delta in client.stream(prompt_messages):
+                    response += delta
+                    resp_container.markdown(response)
+
+            message = {"role": "assistant", "content": response, "latency_seconds": time.perf_counter() - started, "cached": cached is not None}
+            if cached is None:
+                message.update(prompt_stats)
+            # Parse the response for a SQL query and execute if available
+            sql_match = re.search(r"```sql\n(.*)\n```", response, re.DOTALL)
+            if cached is None:
+                completions.store(question, fingerprint, response, sql_match.group(1) if sql_match else None, vector=question_vector)
+            if sql_match:
+                sql = sql_match.group(1)
+                sql = sql.replace('<tableName>', QUALIFIED_TABLE_NAME)
+                if not re.search(r'\b(update|delete|insert)\b', sql, re.IGNORECASE):
+                    # The LLM's "limit to 10" rule is only advisory, so the first page is capped here
+                    results = queries.run_cached_query(conn, paging.page_sql(sql)).head(paging.PAGE_SIZE)
+                    message["result_id"] = store.put(results)
+                    message["sql"] = sql
+                    # Adding bar charts if there is at least 1 dimension and 1 measure
+                    if len(results.columns) == 2:
+                        if len(results) > 1:
+                            fig = go.Figure(data=go.Bar(x=results.iloc[:,0], y=results.iloc[:,1]))
+                            fig.update_layout(xaxis={'categoryorder': 'total descending'})
+                            st.plotly_chart(fig)
+                    elif len(results.columns) <= 1:
+                        pass
+                    else:
+                        y = results.select_dtypes(include=['int','int8', 'int64', 'float64']).columns.tolist()
+                        if len(y) > 0:
+                            fig = go.Figure(data=go.Bar(x=results.iloc[:,0], y=results[y[0]]))
+                            fig.update_layout(xaxis={'categoryorder': 'total descending'})
+                            st.plotly_chart(fig)
+                        else:
+                            pass
+                    st.dataframe(results)
+                else:
+                    # Handle the case where the query contains DML
+                    message["results"] = "Query contains DML operations and is not allowed."
+                    st.write(message["results"])
+            st.session_state.messages.append(message)
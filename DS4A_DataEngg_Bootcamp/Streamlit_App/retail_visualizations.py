@@ -0,0 +1,98 @@
+import plotly.express as px
+import streamlit as st
+
+import db
+import paging
+import queries
+from prompts import QUALIFIED_TABLE_NAME, aggregate_table_names
+
+
+def visualizations():
+    st.title('Big Supply Co. - Retail Analysis')
+    conn = db.get_database()
+
+    st.markdown(""" ### Charts and Analysis: """)
+    st.write("This portion visualizes and explains insights from the Big Supply Co. `orders` table. You can add filters using the panel on the left.")
+
+    # Sidebar with filter options
+    options = queries.filter_options(conn)
+    st.sidebar.subheader("Filter Data")
+    selected_region = st.sidebar.selectbox("Select Region", options["Region"])
+    selected_category = st.sidebar.selectbox("Select Category", options["Category"])
+    selected_segment = st.sidebar.selectbox("Select Customer Segment", options["Customer Segment"])
+
+    # Explanation for filter options
+    st.sidebar.write("You can filter data by region, product category, and customer segment.")
+
+    # Filter the data based on user selection, the filtering happens in the warehouse
+    filters = {
+        "ORDER_REGION_ADDR": selected_region,
+        "CATEGORY_NAME_ATTR": selected_category,
+        "CUSTOMER_SEGMENT_CAT": selected_segment,
+    }
+
+    st.header("View the raw, filtered data first:")
+
+    # Explanation for the selected filters
+    # st.write(f"Filtered by Region: {selected_region}")
+    # st.write(f"Filtered by Category: {selected_category}")
+    # st.write(f"Filtered by Customer Segment: {selected_segment}")
+
+    # Show the filtered data, one page at a time
+    paging.paged_dataframe(conn, queries.filtered_orders_sql(filters), key="filtered_orders", order_by=", ".join(queries.ORDER_KEY_COLUMNS))
+
+    # Add a switch button to toggle between overall and filtered dataset
+    st.subheader("For these charts, you can use this toggle here to view by the filters you provided or by the complete dataset for the full picture:")
+    use_filtered_data = st.checkbox("Use Filtered Data")
+
+    # Aggregate over the filters based on user selection or over the overall dataset
+    if not use_filtered_data:
+        filters = None
+
+    # Visualization 1: Sales by Region
+    st.header("Sales by Region")
+    region_sales = queries.run_cached_query(conn, queries.region_sales_sql(filters, aggregate_table=aggregate_table_names().get("region")))
+    fig1 = px.bar(region_sales, x='ORDER_REGION_ADDR', y='SALES_AMT', title="Total Sales by Region")
+    fig1.update_xaxes(title_text="Region")
+    fig1.update_yaxes(title_text="Total Sales Amount")
+    st.plotly_chart(fig1)
+    st.write("This bar chart shows the total sales amount for each region.")
+
+    # # Visualization 2: Product Price Variance
+    # st.header("Product Price Variance")
+    # product_variance = data.groupby('PRODUCT_CARD_ID')['PRODUCT_PRICE_AMT'].var().reset_index()
+    # fig2 = px.histogram(product_variance, x='PRODUCT_PRICE_AMT', nbins=30, title="Product Price Variance")
+    # st.plotly_chart(fig2)
+    # st.write("This histogram represents the variance in product prices. A higher variance indicates price fluctuations.")
+
+    # # Visualization 3: Average Order Amount by Customer Segment
+    # st.header("Average Order Amount by Customer Segment")
+    # avg_order_segment = data.groupby('CUSTOMER_SEGMENT_CAT')['ORDER_ITEM_TOTAL_AMT'].mean().reset_index()
+    # fig3 = px.bar(avg_order_segment, x='CUSTOMER_SEGMENT_CAT', y='ORDER_ITEM_TOTAL_AMT', title="Average Order Amount by Customer Segment")
+    # fig3.update_xaxes(title_text="Customer Segment")
+    # fig3.update_yaxes(title_text="Total Order Item Amount")
+    # st.plotly_chart(fig3)
+    # st.write("This bar chart displays the average order amount for each customer segment.")
+    
+    # Create a combo line chart for sales and profit over time
+    st.header(f"Sales and Profit Over Time")
+    sales_profit_data = queries.run_cached_query(conn, queries.sales_profit_sql(filters))
+    fig_combo = px.line(sales_profit_data, x='ORDER_DT', y='SALES_AMT', title="Sales Over Time")
+    fig_combo.add_bar(x=sales_profit_data['ORDER_DT'], y=sales_profit_data['ORDER_PROFIT_AMT'], name="Profit")
+    fig_combo.update_xaxes(title_text="Date")
+    fig_combo.update_yaxes(title_text="Sales and Profit")
+    st.plotly_chart(fig_combo)
+    st.write("This combo chart displays both sales and profit over time for the selected region.")
+
+    # Visualization 4: Delivery Status
+    st.header("Delivery Status")
+    delivery_status = queries.run_cached_query(conn, queries.delivery_status_sql(filters))
+    fig4 = px.pie(delivery_status, names='DELIVERY_STATUS_CAT', values='N_ORDERS', title="Delivery Status Distribution")
+    fig4.update_xaxes(title_text="Delivery Status")
+    fig4.update_yaxes(title_text="Frequency")
+    st.plotly_chart(fig4)
+    st.write("This pie chart illustrates the distribution of delivery statuses for orders.")
+
+    st.markdown(""" ### QIY (Query It Yourself 💪): """)
+    text_input = st.text_input("Replace this with your own SQL query 👇 (you can just use `table` instead of any specifics)", "select * from table limit 10;",)
+    paging.paged_dataframe(conn, text_input, key="qiy", table_name=QUALIFIED_TABLE_NAME)
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from atomic_file import atomic_write
+
+# Bump when the artifact layout changes so old files are rebuilt instead of misread
+ARTIFACT_VERSION = 2
+# Built by `python schema_context.py --build` right after `dbt run` in the deploy, so a fresh container
+# reads it instead of introspecting the warehouse on its first chat
+ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema_context.json")
+DBT_PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "BigSupplyCo_dbt")
+ATTRIBUTES_SEED = os.path.join(DBT_PROJECT_DIR, "seeds", "bigsupplyco_attributes.csv")
+
+
+def schema_hash(dbt_project_dir: str = DBT_PROJECT_DIR):
+    # The ORDERS table and the attributes table are both built by the dbt project,
+    # so its models and seeds decide whether the stored context is still current
+    files = sorted(
+        glob.glob(os.path.join(dbt_project_dir, "models", "**", "*.sql"), recursive=True)
+        + glob.glob(os.path.join(dbt_project_dir, "models", "**", "*.yml"), recursive=True)
+        + glob.glob(os.path.join(dbt_project_dir, "seeds", "*.csv"))
+    )
+    if not files:
+        return None
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.relpath(path, dbt_project_dir).replace(os.sep, "/").encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def seed_metadata(path: str = ATTRIBUTES_SEED) -> list:
+    # Same rows as the BIGSUPPLYCO_ATTRIBUTES table, read from the dbt seed it is loaded from
+    with open(path, newline="", encoding="utf-8") as f:
+        return [[row["variable_name"], row["definition"]] for row in csv.DictReader(f)]
+
+
+def columns_query(table_name: str) -> str:
+    table = table_name.split(".")
+    return f"""
+        SELECT COLUMN_NAME, DATA_TYPE FROM {table[0].upper()}.INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_SCHEMA = '{table[1].upper()}' AND TABLE_NAME = '{table[2].upper()}'
+        """
+
+
+def table_columns(table_name: str, run_query) -> list:
+    columns = run_query(columns_query(table_name))
+    return [[name, data_type] for name, data_type in zip(columns["COLUMN_NAME"], columns["DATA_TYPE"])]
+
+
+def build_artifact(table_name: str, run_query, metadata_query: str = None, current_hash: str = None, aggregate_tables: list = ()) -> dict:
+    # One-off introspection: the columns come from the warehouse, the metadata from the seed
+    # when it is available locally and from metadata_query otherwise
+    columns = table_columns(table_name, run_query)
+    metadata = []
+    if metadata_query:
+        if os.path.exists(ATTRIBUTES_SEED):
+            metadata = seed_metadata()
+        else:
+            rows = run_query(metadata_query)
+            metadata = [[name, definition] for name, definition in zip(rows["VARIABLE_NAME"], rows["DEFINITION"])]
+    return {
+        "version": ARTIFACT_VERSION,
+        "schema_hash": current_hash,
+        "table_name": table_name,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "columns": columns,
+        "metadata": metadata,
+        "aggregates": {aggregate: table_columns(aggregate, run_query) for aggregate in aggregate_tables},
+    }
+
+
+def load_artifact(path: str = ARTIFACT_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_artifact(artifact: dict, path: str = ARTIFACT_PATH):
+    with atomic_write(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+
+
+def is_current(artifact, table_name: str, metadata_query: str, current_hash, aggregate_tables: list = ()) -> bool:
+    if artifact is None or artifact.get("version") != ARTIFACT_VERSION or artifact.get("table_name") != table_name:
+        return False
+    if sorted(artifact.get("aggregates", {})) != sorted(aggregate_tables):
+        return False
+    if metadata_query and not artifact.get("metadata"):
+        return False
+    # Without the dbt project next to the app there is nothing to compare against, keep the artifact
+    return current_hash is None or artifact.get("schema_hash") == current_hash
+
+
+def load_or_build(table_name: str, run_query, metadata_query: str = None, path: str = ARTIFACT_PATH, aggregate_tables: list = ()) -> dict:
+    current_hash = schema_hash()
+    artifact = load_artifact(path)
+    if not is_current(artifact, table_name, metadata_query, current_hash, aggregate_tables):
+        artifact = build_artifact(table_name, run_query, metadata_query, current_hash, aggregate_tables)
+        save_artifact(artifact, path)
+    return artifact
+
+
+# do `python schema_context.py --build` after `dbt run` (connection from .streamlit/secrets.toml) to build
+# the stored context at deploy, `python schema_context.py` to check whether it matches the dbt project
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or build the table context the chatbot's system prompt is made from")
+    parser.add_argument("--build", action="store_true", help="introspect the warehouse when the artifact is missing or stale")
+    args = parser.parse_args()
+
+    current_hash = schema_hash()
+    print(f"dbt schema hash: {current_hash}")
+    if args.build:
+        import db
+        import prompts
+
+        artifact = load_or_build(
+            prompts.QUALIFIED_TABLE_NAME,
+            db.get_database().query,
+            prompts.METADATA_QUERY,
+            aggregate_tables=list(prompts.aggregate_table_names().values()),
+        )
+        print(f"Artifact v{artifact['version']} built {artifact['built_at']} for {artifact['table_name']} at {ARTIFACT_PATH}")
+    else:
+        artifact = load_artifact()
+        if artifact is None:
+            print(f"No artifact at {ARTIFACT_PATH}, run with --build or it is built on the first chatbot start")
+        else:
+            state = "current" if artifact.get("schema_hash") == current_hash else "stale, rebuilt on next start"
+            print(f"Artifact v{artifact['version']} built {artifact['built_at']} for {artifact['table_name']}: {state}")
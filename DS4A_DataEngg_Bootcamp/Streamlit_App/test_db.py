@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+# Nothing in these tests is worth a line in the app's spans.jsonl
+os.environ.setdefault("TRACING", "0")
+
+import db  # noqa: E402
+
+
+class DatabaseTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.database = db.Database.from_url(f"sqlite:///{self.path}", pool_size=2, chunk_rows=3)
+        self.database.execute("CREATE TABLE orders (id INTEGER, region TEXT)")
+        for i in range(10):
+            self.database.execute("INSERT INTO orders VALUES (?, ?)", (i, "Europe" if i % 2 else "Asia"))
+
+    def tearDown(self):
+        self.database.pool.close()
+        os.remove(self.path)
+
+    def test_chunks(self):
+        chunks = list(self.database.iter_chunks("SELECT * FROM orders ORDER BY id"))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 1])
+        self.assertEqual(self.database.query("SELECT * FROM orders ORDER BY id")["id"].tolist(), list(range(10)))
+        self.assertEqual(self.database.timings[-1]["chunks"], 4)
+        self.assertEqual(self.database.timings[-1]["rows"], 10)
+
+    def test_empty_result_keeps_columns(self):
+        df = self.database.query("SELECT * FROM orders WHERE region = ?", ("Africa",))
+        self.assertTrue(df.empty)
+        self.assertEqual(df.columns.tolist(), ["id", "region"])
+
+    def test_failed_query_is_recorded_and_connection_reused(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.database.query("SELECT * FROM missing")
+        self.assertEqual(self.database.timings[-1]["status"], "OperationalError")
+        self.assertEqual(len(self.database.query("SELECT 1 AS one")), 1)
+        self.assertEqual(self.database.pool.stats()["discarded"], 0)
+
+    def test_returns_rows(self):
+        self.assertTrue(db._returns_rows("  SELECT * FROM orders"))
+        self.assertTrue(db._returns_rows("(select id from orders) union (select id from orders)"))
+        self.assertTrue(db._returns_rows("( (WITH t AS (SELECT 1) SELECT * FROM t))"))
+        self.assertFalse(db._returns_rows("INSERT INTO orders VALUES (1, 'Asia')"))
+        self.assertFalse(db._returns_rows("selection"))
+
+    def test_pool_exhaustion_times_out(self):
+        pool = db.ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), max_size=1, timeout=0.1)
+        with pool.connection():
+            with self.assertRaises(TimeoutError):
+                with pool.connection():
+                    pass
+        # The slot is free again once the first caller is done
+        with pool.connection() as conn:
+            self.assertIsNotNone(conn)
+        self.assertEqual(pool.stats()["opened"], 1)
+
+    def test_unhealthy_connection_is_replaced(self):
+        pool = db.ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), max_size=1, check_after=0.0)
+        with pool.connection() as conn:
+            first = conn
+        # A closed connection fails the health check on the next checkout and is not handed out again
+        first.close()
+        with pool.connection() as conn:
+            self.assertIsNot(conn, first)
+            self.assertEqual(conn.execute("SELECT 1").fetchone(), (1,))
+        self.assertEqual(pool.stats()["opened"], 2)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    def test_concurrent_checkouts_are_counted(self):
+        pool = db.ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), max_size=4)
+
+        def checkout():
+            for _ in range(50):
+                with pool.connection() as conn:
+                    conn.execute("SELECT 1").fetchone()
+
+        threads = [threading.Thread(target=checkout) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.stats()
+        self.assertLessEqual(stats["opened"], 4)
+        self.assertEqual(stats["idle"], stats["opened"] - stats["discarded"])
+
+
+# do `python -m unittest test_db` from Streamlit_App, sqlite3 is all it needs
+if __name__ == "__main__":
+    unittest.main()
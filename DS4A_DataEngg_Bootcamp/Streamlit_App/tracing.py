@@ -0,0 +1,217 @@
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from atomic_file import atomic_write
+
+# Configured from the environment rather than st.secrets so the offline scripts (fraud_model.py,
+# the benchmarks) write to the same files as the app. TRACING=0 turns recording off.
+TRACE_DIR = os.environ.get("TRACE_DIR", os.path.join(tempfile.gettempdir(), "bigsupplyco_traces"))
+ENABLED = os.environ.get("TRACING", "1") != "0"
+# spans.jsonl is moved to spans.jsonl.1 once it reaches this size, so at most twice this is kept on disk
+MAX_JSONL_BYTES = int(os.environ.get("TRACE_MAX_BYTES", 50 * 1024 * 1024))
+# Spans kept in memory for the debug panel, older ones are only in the JSONL file
+RECENT_SPANS = 2000
+# Upper bounds, in seconds, of the Prometheus histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Attributes low-cardinality enough to become Prometheus labels, the rest only go to the JSONL file
+LABEL_ATTRIBUTES = ("page", "model", "mode")
+
+_current = contextvars.ContextVar("tracing_current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, attributes: dict):
+        parent = _current.get()
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent = parent.id if parent else None
+        # The root is the page run, so the debug panel can show everything one rerun did
+        self.root = parent.root if parent else self.id
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.started = time.perf_counter()
+        self.start_time = time.time()
+        self.seconds = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record(self) -> dict:
+        return {
+            "ts": self.start_time,
+            "name": self.name,
+            "id": self.id,
+            "parent": self.parent,
+            "root": self.root,
+            "seconds": self.seconds,
+            "status": self.status,
+            **self.attributes,
+        }
+
+
+class Tracer:
+    # Finished spans go to three places: a ring buffer for the debug panel, per-span histograms
+    # exported in the Prometheus text format, and one JSON line each in spans.jsonl
+
+    def __init__(self, directory: str = TRACE_DIR):
+        self.directory = directory
+        self.jsonl_path = os.path.join(directory, "spans.jsonl")
+        self.prometheus_path = os.path.join(directory, "metrics.prom")
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def finish(self, span: Span):
+        record = span.record()
+        labels = tuple((key, str(span.attributes[key])) for key in LABEL_ATTRIBUTES if key in span.attributes)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.recent.append(record)
+            metric = self._metrics.setdefault((span.name, labels), {"count": 0, "sum": 0.0, "errors": 0, "rows": 0, "bytes": 0, "buckets": [0] * len(BUCKETS)})
+            metric["count"] += 1
+            metric["sum"] += span.seconds
+            metric["errors"] += span.status not in ("ok", "stopped")
+            metric["rows"] += int(span.attributes.get("rows") or 0)
+            metric["bytes"] += int(span.attributes.get("bytes") or 0)
+            for i, bound in enumerate(BUCKETS):
+                if span.seconds <= bound:
+                    metric["buckets"][i] += 1
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = open(self.jsonl_path, "a", buffering=1)
+            self._file.write(line + "\n")
+            if self._file.tell() >= MAX_JSONL_BYTES:
+                self._file.close()
+                self._file = None
+                os.replace(self.jsonl_path, self.jsonl_path + ".1")
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            metrics = {key: {**value, "buckets": list(value["buckets"])} for key, value in self._metrics.items()}
+        lines = [
+            "# HELP app_span_seconds Duration of traced pages, queries, LLM calls and model fits",
+            "# TYPE app_span_seconds histogram",
+        ]
+        totals = []
+        for (name, labels), metric in sorted(metrics.items()):
+            label_text = ",".join([f'span="{name}"'] + [f'{key}="{value}"' for key, value in labels])
+            for bound, count in zip(BUCKETS, metric["buckets"]):
+                lines.append(f'app_span_seconds_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'app_span_seconds_bucket{{{label_text},le="+Inf"}} {metric["count"]}')
+            lines.append(f"app_span_seconds_sum{{{label_text}}} {metric['sum']:.6f}")
+            lines.append(f"app_span_seconds_count{{{label_text}}} {metric['count']}")
+            totals.append((label_text, metric))
+        for counter, help_text in (("errors", "Traced spans that raised"), ("rows", "Rows returned or written by traced spans"), ("bytes", "Bytes returned or written by traced spans")):
+            lines.append(f"# HELP app_span_{counter}_total {help_text}")
+            lines.append(f"# TYPE app_span_{counter}_total counter")
+            lines.extend(f"app_span_{counter}_total{{{label_text}}} {metric[counter]}" for label_text, metric in totals)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        # For node_exporter's textfile collector or any scraper reading the file.
+        # Every session's page run writes the metrics when it ends
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_write(self.prometheus_path) as tmp_path, open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+
+    def spans(self, root: str = None) -> list:
+        with self._lock:
+            return [record for record in self.recent if root is None or record["root"] == root]
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    # One tracer per process, shared by every session like the query cache
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+@contextmanager
+def span(name: str, **attributes):
+    # Times the block. Spans opened inside it become its children; call .set(rows=..., bytes=...)
+    # on the yielded span to attach counts.
+    if not ENABLED:
+        yield Span(name, attributes)
+        return
+    current = Span(name, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        # Streamlit's st.stop() and reruns are exceptions too, they are not errors of the span
+        current.status = "stopped" if type(e).__module__.startswith("streamlit") else type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        current.seconds = time.perf_counter() - current.started
+        get_tracer().finish(current)
+
+
+def record(name: str, seconds: float, **attributes):
+    # For timings measured elsewhere, e.g. a generator that cannot hold a span open across yields
+    if not ENABLED:
+        return
+    finished = Span(name, attributes)
+    finished.status = finished.attributes.pop("status", "ok")
+    finished.seconds = seconds
+    finished.start_time = time.time() - seconds
+    get_tracer().finish(finished)
+
+
+def traced_stream(name: str, deltas, **attributes):
+    # Passes a streamed LLM response through, recording time to first token and total time
+    started = time.perf_counter()
+    first_token_seconds = None
+    chunks = 0
+    status = "ok"
+    try:
+        for delta in deltas:
+            if first_token_seconds is None and delta:
+                first_token_seconds = time.perf_counter() - started
+            chunks += 1
+            yield delta
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        record(name, time.perf_counter() - started, first_token_seconds=first_token_seconds, chunks=chunks, status=status, **attributes)
+
+
+def frame_bytes(df) -> int:
+    # Shallow size, deep=True would walk every string and cost more than the query it measures
+    return int(df.memory_usage(index=False).sum())
+
+
+def render_debug_panel(root: str):
+    # Spans of the last page run in this session, then latency percentiles per span over recent runs
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander("Performance debug panel"):
+        spans = pd.DataFrame(get_tracer().spans(root))
+        if spans.empty:
+            st.caption("Nothing traced for this page run.")
+            return
+        spans["ms"] = spans["seconds"] * 1000
+        columns = [c for c in ["name", "ms", "status", "page", "rows", "bytes", "first_token_seconds", "model", "sql"] if c in spans.columns]
+        st.dataframe(spans[columns], hide_index=True, use_container_width=True)
+
+        recent = pd.DataFrame(get_tracer().spans())
+        summary = recent.groupby("name")["seconds"].describe(percentiles=[0.5, 0.99])[["count", "50%", "99%", "max"]] * [1, 1000, 1000, 1000]
+        st.caption("Recent spans in this process, milliseconds")
+        st.dataframe(summary.rename(columns={"50%": "p50_ms", "99%": "p99_ms", "max": "max_ms"}), use_container_width=True)
+        st.caption(f"All spans: {get_tracer().jsonl_path}, Prometheus metrics: {get_tracer().prometheus_path}")
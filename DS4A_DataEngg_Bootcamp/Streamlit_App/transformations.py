@@ -0,0 +1,188 @@
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Rules a column can have in the transformations JSON, in the order they are applied.
+# Renames always run last, after every other rule, so no rule depends on another column's new name.
+RULE_ORDER = ["astype", "map", "len", "datediff", "rename"]
+DATEDIFF_COLUMN = "Days Since Opening Acct"
+
+
+class TransformationError(ValueError):
+    pass
+
+
+def load_spec(file) -> dict:
+    # A column can be listed more than once (e.g. "Card Number" for astype and len),
+    # plain json.load would silently keep only the last entry
+    def merge_duplicates(pairs):
+        spec = {}
+        for key, value in pairs:
+            if isinstance(spec.get(key), dict) and isinstance(value, dict):
+                spec[key] = {**spec[key], **value}
+            else:
+                spec[key] = value
+        return spec
+
+    if hasattr(file, "read"):
+        text = file.read()
+    else:
+        with open(file, encoding="utf-8") as f:
+            text = f.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    return json.loads(text, object_pairs_hook=merge_duplicates)
+
+
+def _validate_rule(column: str, rule: str, arg):
+    if rule == "astype":
+        try:
+            pd.api.types.pandas_dtype(arg)
+        except TypeError as e:
+            raise TransformationError(f"{column}: unknown astype dtype {arg!r}") from e
+    elif rule == "map":
+        if not isinstance(arg, dict):
+            raise TransformationError(f"{column}: map needs an object of old -> new values")
+    elif rule == "len":
+        if not isinstance(arg, int) or isinstance(arg, bool) or arg <= 0:
+            raise TransformationError(f"{column}: len needs a positive integer")
+    elif rule == "datediff":
+        if isinstance(arg, dict):
+            arg = arg.get("to", "Today")
+        if str(arg).lower() != "today":
+            try:
+                pd.Timestamp(arg)
+            except ValueError as e:
+                raise TransformationError(f"{column}: datediff needs 'Today' or a date") from e
+    elif rule == "rename":
+        if not isinstance(arg, str) or not arg:
+            raise TransformationError(f"{column}: rename needs a new column name")
+    else:
+        raise TransformationError(f"{column}: unknown rule {rule!r}, expected one of {', '.join(RULE_ORDER)}")
+
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    # Card dates like "09/2002" repeat a lot, so each distinct string is parsed once and mapped back
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return pd.to_datetime(series)
+    codes, uniques = pd.factorize(series)
+    parsed = pd.to_datetime(pd.Series(uniques), format="mixed").to_numpy()
+    values = np.where(codes >= 0, parsed[np.maximum(codes, 0)], np.datetime64("NaT"))
+    return pd.Series(values, index=series.index, name=series.name, dtype="datetime64[ns]")
+
+
+class TransformationPlan:
+    # A transformations spec compiled once into an ordered list of (rule, column, arg) steps
+
+    def __init__(self, steps: list):
+        self.steps = steps
+
+    @property
+    def columns(self) -> set:
+        return {column for _, column, _ in self.steps}
+
+    def __len__(self):
+        return len(self.steps)
+
+    def apply(self, df: pd.DataFrame, today: datetime = None):
+        # Every step replaces one column of a shallow copy, the input frame is never modified
+        # and no per-column copy of the whole frame is made
+        today = pd.Timestamp(today or datetime.today())
+        out = df.copy(deep=False)
+        report = {"applied": [], "skipped": [], "invalid_rows": {}}
+        renames = {}
+
+        for rule, column, arg in self.steps:
+            if column not in out.columns:
+                report["skipped"].append((rule, column))
+                continue
+            if rule == "astype" and pd.api.types.is_datetime64_dtype(pd.api.types.pandas_dtype(arg)):
+                out[column] = _to_datetime(out[column])
+            elif rule == "astype":
+                out[column] = out[column].astype(arg)
+            elif rule == "map":
+                out[column] = out[column].map(arg)
+            elif rule == "len":
+                # Reported, not dropped, so one bad rule cannot empty the upload
+                lengths = out[column].astype(str).str.len().to_numpy()
+                report["invalid_rows"][column] = int(np.count_nonzero(lengths != arg))
+            elif rule == "datediff":
+                target = arg.get("to", "Today") if isinstance(arg, dict) else arg
+                name = arg.get("as", DATEDIFF_COLUMN) if isinstance(arg, dict) else DATEDIFF_COLUMN
+                reference = today if str(target).lower() == "today" else pd.Timestamp(target)
+                out[column] = _to_datetime(out[column])
+                out[name] = (reference - out[column]).dt.days
+            elif rule == "rename":
+                renames[column] = arg
+            report["applied"].append((rule, column))
+
+        if renames:
+            out = out.rename(columns=renames)
+        return out, report
+
+
+def compile_plan(spec: dict) -> TransformationPlan:
+    # Validates the whole spec up front, so a bad rule fails before any data is touched
+    if not isinstance(spec, dict):
+        raise TransformationError("The transformations JSON must be an object of column -> rules")
+    steps = []
+    datediff_outputs = []
+    for column, rules in spec.items():
+        if not isinstance(rules, dict):
+            raise TransformationError(f"{column}: rules must be an object, e.g. {{\"astype\": \"str\"}}")
+        for rule, arg in rules.items():
+            _validate_rule(column, rule, arg)
+            if rule == "datediff":
+                datediff_outputs.append(arg.get("as", DATEDIFF_COLUMN) if isinstance(arg, dict) else DATEDIFF_COLUMN)
+            steps.append((rule, column, arg))
+
+    if len(datediff_outputs) != len(set(datediff_outputs)):
+        raise TransformationError("Several datediff rules write the same column, give each one an \"as\" name")
+    new_names = [arg for rule, _, arg in steps if rule == "rename"]
+    if len(new_names) != len(set(new_names)):
+        raise TransformationError("Two columns are renamed to the same name")
+
+    steps.sort(key=lambda step: RULE_ORDER.index(step[0]))
+    return TransformationPlan(steps)
+
+
+def _synthetic_cards(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(1613)
+    months = rng.integers(1, 13, rows)
+    return pd.DataFrame({
+        "User": rng.integers(0, 2000, rows),
+        "CARD INDEX": rng.integers(0, 9, rows),
+        "Card Number": rng.integers(4 * 10**15, 5 * 10**15, rows),
+        "Expires": pd.Series(months).map("{:02d}".format) + "/" + rng.integers(2020, 2030, rows).astype(str),
+        "Has Chip": rng.choice(["YES", "NO"], rows),
+        "Card on Dark Web": rng.choice(["YES", "NO"], rows),
+        "Acct Open Date": pd.Series(months).map("{:02d}".format) + "/" + rng.integers(1995, 2020, rows).astype(str),
+    })
+
+
+# do `python transformations.py --rows 5000000` to benchmark the plan on a synthetic card file
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark a compiled transformations plan")
+    parser.add_argument("--spec", default="../Project 2/Data_Files/transformations.json")
+    parser.add_argument("--file", help="CSV or Parquet card file, a synthetic one is generated when omitted")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    plan = compile_plan(load_spec(args.spec))
+    if args.file:
+        df = pd.read_parquet(args.file) if args.file.lower().endswith(".parquet") else pd.read_csv(args.file)
+    else:
+        df = _synthetic_cards(args.rows)
+
+    started = time.perf_counter()
+    result, report = plan.apply(df)
+    seconds = time.perf_counter() - started
+    print(f"{len(plan)} steps on {len(df):,} rows in {seconds:.2f}s ({len(df) / seconds:,.0f} rows/s)")
+    print(f"applied: {report['applied']}")
+    print(f"skipped: {report['skipped']}")
+    print(f"invalid rows: {report['invalid_rows']}")